@@ -0,0 +1,386 @@
+"""
+Async API Routes for Qwen Image Generator
+
+요청 파싱, 헬스체크, 메트릭, 파일 제공은 이벤트 루프에서 처리하고
+GPU 작업은 전용 실행기(GPUExecutor)로 넘깁니다.
+"""
+from quart import Blueprint, Response, request, jsonify, send_file
+import asyncio
+import base64
+import logging
+import os
+from datetime import datetime
+from typing import Optional
+from werkzeug.exceptions import HTTPException
+from . import routes
+from .routes import (
+    build_generate_response,
+    build_image_headers,
+    check_admin,
+    parse_generate_request,
+    parse_profile_request,
+    parse_refine_request,
+)
+from ..core.config import Config
+from ..core.gpu_executor import GPUExecutor, QueueFullError
+
+logger = logging.getLogger(__name__)
+
+# Create Blueprint
+async_api_bp = Blueprint('async_api', __name__)
+
+# Global variables
+gpu_executor: Optional[GPUExecutor] = None
+retry_after_seconds = 10
+draining = False
+
+def init_executor(executor: GPUExecutor, config: Config):
+    """GPU 실행기를 등록합니다"""
+    global gpu_executor, retry_after_seconds, draining
+    gpu_executor = executor
+    retry_after_seconds = config.RETRY_AFTER_SECONDS
+    draining = False
+
+def begin_drain():
+    """새 생성 요청을 거부하고 진행 중인 작업만 마무리하도록 전환합니다"""
+    global draining
+    draining = True
+    in_flight = gpu_executor.in_flight if gpu_executor is not None else 0
+    logger.info(f"드레인 시작 - 진행 중인 작업: {in_flight}")
+
+def _retry_after(response, status: int):
+    """Retry-After 헤더를 붙인 응답을 반환합니다"""
+    response.headers['Retry-After'] = str(retry_after_seconds)
+    return response, status
+
+@async_api_bp.route('/health', methods=['GET'])
+async def health_check():
+    """헬스 체크 엔드포인트"""
+    if routes.model_loading:
+        return jsonify({
+            "status": "loading",
+            "message": "모델을 로딩 중입니다...",
+            "timestamp": datetime.now().isoformat()
+        }), 202
+
+    if routes.image_generator is None:
+        return jsonify({
+            "status": "error",
+            "message": "모델이 로드되지 않았습니다",
+            "timestamp": datetime.now().isoformat()
+        }), 503
+
+    return jsonify({
+        "status": "draining" if draining else "ready",
+        "message": "서비스가 종료 중입니다" if draining else "서비스가 준비되었습니다",
+        "model_info": routes.image_generator.get_model_info(),
+        "timestamp": datetime.now().isoformat()
+    }), 200
+
+@async_api_bp.route('/generate', methods=['POST'])
+async def generate_image():
+    """이미지 생성 엔드포인트"""
+    image_generator = routes.image_generator
+
+    # Check model loading status
+    if routes.model_loading:
+        return _retry_after(jsonify({
+            "success": False,
+            "error": "모델을 로딩 중입니다. 잠시 후 다시 시도하세요.",
+            "status": "loading"
+        }), 202)
+
+    if image_generator is None:
+        return jsonify({
+            "success": False,
+            "error": "모델이 로드되지 않았습니다. 서버를 재시작하세요.",
+            "status": "error"
+        }), 503
+
+    if draining or gpu_executor is None:
+        return _retry_after(jsonify({
+            "success": False,
+            "error": "서버가 종료 중입니다. 잠시 후 다시 시도하세요.",
+            "status": "draining"
+        }), 503)
+
+    try:
+        # Parse request data
+        if not request.is_json:
+            return jsonify({
+                "success": False,
+                "error": "JSON 형식의 데이터가 필요합니다"
+            }), 400
+
+        data = await request.get_json(silent=True)
+
+        try:
+            params = parse_generate_request(data, image_generator.config)
+        except ValueError as e:
+            return jsonify({
+                "success": False,
+                "error": str(e)
+            }), 400
+
+        prompt = params["prompt"]
+        response_format = params.pop("response_format")
+
+        logger.info(f"이미지 생성 요청: {prompt[:100]}...")
+
+        # Hand GPU work to the dedicated executor (PNG encoding overlaps the next job)
+        try:
+            future = gpu_executor.submit_image_job(image_generator.generate_image, **params)
+        except QueueFullError as e:
+            return _retry_after(jsonify({
+                "success": False,
+                "error": str(e),
+                "status": "busy"
+            }), 429)
+
+        result = await asyncio.wrap_future(future)
+
+        if not result["success"]:
+            return jsonify(result), 500
+
+        response_data = build_generate_response(result)
+
+        logger.info("이미지 생성 요청 완료")
+        if response_format == 'png':
+            return Response(
+                base64.b64decode(response_data["image_base64"]),
+                mimetype='image/png',
+                headers=build_image_headers(response_data)
+            )
+        return jsonify(response_data), 200
+
+    except HTTPException:
+        # Let the blueprint error handlers answer (e.g. 413 for oversized bodies)
+        raise
+    except Exception as e:
+        logger.error(f"이미지 생성 중 오류: {str(e)}")
+        return jsonify({
+            "success": False,
+            "error": "내부 서버 오류가 발생했습니다"
+        }), 500
+
+@async_api_bp.route('/refine', methods=['POST'])
+async def refine_image():
+    """초안 잠재 텐서를 업스케일하고 이어서 디노이징하는 엔드포인트"""
+    image_generator = routes.image_generator
+
+    # Check model loading status
+    if routes.model_loading:
+        return _retry_after(jsonify({
+            "success": False,
+            "error": "모델을 로딩 중입니다. 잠시 후 다시 시도하세요.",
+            "status": "loading"
+        }), 202)
+
+    if image_generator is None:
+        return jsonify({
+            "success": False,
+            "error": "모델이 로드되지 않았습니다. 서버를 재시작하세요.",
+            "status": "error"
+        }), 503
+
+    if draining or gpu_executor is None:
+        return _retry_after(jsonify({
+            "success": False,
+            "error": "서버가 종료 중입니다. 잠시 후 다시 시도하세요.",
+            "status": "draining"
+        }), 503)
+
+    try:
+        # Parse request data
+        if not request.is_json:
+            return jsonify({
+                "success": False,
+                "error": "JSON 형식의 데이터가 필요합니다"
+            }), 400
+
+        try:
+            params = parse_refine_request(await request.get_json(silent=True), image_generator.config)
+        except ValueError as e:
+            return jsonify({
+                "success": False,
+                "error": str(e)
+            }), 400
+
+        response_format = params.pop("response_format")
+
+        logger.info(f"초안 개선 요청: {params['draft_id']}")
+
+        # Hand GPU work to the dedicated executor
+        try:
+            future = gpu_executor.submit_image_job(image_generator.refine_image, **params)
+        except QueueFullError as e:
+            return _retry_after(jsonify({
+                "success": False,
+                "error": str(e),
+                "status": "busy"
+            }), 429)
+
+        try:
+            result = await asyncio.wrap_future(future)
+        except KeyError:
+            return jsonify({
+                "success": False,
+                "error": "초안을 찾을 수 없습니다 (만료되었거나 제거됨)"
+            }), 404
+        except ValueError as e:
+            return jsonify({
+                "success": False,
+                "error": str(e)
+            }), 400
+
+        if not result["success"]:
+            return jsonify(result), 500
+
+        response_data = build_generate_response(result)
+
+        logger.info("초안 개선 요청 완료")
+        if response_format == 'png':
+            return Response(
+                base64.b64decode(response_data["image_base64"]),
+                mimetype='image/png',
+                headers=build_image_headers(response_data)
+            )
+        return jsonify(response_data), 200
+
+    except HTTPException:
+        # Let the blueprint error handlers answer (e.g. 413 for oversized bodies)
+        raise
+    except Exception as e:
+        logger.error(f"초안 개선 중 오류: {str(e)}")
+        return jsonify({
+            "success": False,
+            "error": "내부 서버 오류가 발생했습니다"
+        }), 500
+
+@async_api_bp.route('/model-info', methods=['GET'])
+async def get_model_info():
+    """모델 정보 조회 엔드포인트"""
+    if routes.image_generator is None:
+        return jsonify({
+            "success": False,
+            "error": "모델이 로드되지 않았습니다"
+        }), 503
+
+    try:
+        model_info = routes.image_generator.get_model_info()
+        return jsonify({
+            "success": True,
+            "model_info": model_info,
+            "timestamp": datetime.now().isoformat()
+        }), 200
+    except Exception as e:
+        logger.error(f"모델 정보 조회 중 오류: {str(e)}")
+        return jsonify({
+            "success": False,
+            "error": "모델 정보를 가져올 수 없습니다"
+        }), 500
+
+@async_api_bp.route('/metrics', methods=['GET'])
+async def get_metrics():
+    """서버 및 GPU 실행기 메트릭 조회 엔드포인트"""
+    return jsonify({
+        "success": True,
+        "model_loaded": routes.image_generator is not None,
+        "model_loading": routes.model_loading,
+        "draining": draining,
+        "gpu_executor": gpu_executor.stats() if gpu_executor is not None else None,
+        "latent_store": routes.image_generator.latent_store.stats() if routes.image_generator is not None else None,
+        "timestamp": datetime.now().isoformat()
+    }), 200
+
+@async_api_bp.route('/debug/profile', methods=['GET', 'POST'])
+async def debug_profile():
+    """다음 요청들의 프로파일링을 설정하거나 상태를 조회하는 관리자 엔드포인트"""
+    if routes.image_generator is None:
+        return jsonify({
+            "success": False,
+            "error": "모델이 로드되지 않았습니다"
+        }), 503
+
+    denied = check_admin(request.headers.get('X-Admin-Token'), routes.image_generator.config)
+    if denied is not None:
+        return jsonify(denied[0]), denied[1]
+
+    profiler = routes.image_generator.profiler
+    if request.method == 'GET':
+        return jsonify({"success": True, "profiler": profiler.status()}), 200
+
+    try:
+        options = parse_profile_request(await request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
+
+    status = profiler.arm(**options) if options else profiler.disarm()
+    return jsonify({"success": True, "profiler": status}), 200
+
+@async_api_bp.route('/debug/profile/<trace_id>', methods=['GET'])
+async def download_profile(trace_id):
+    """저장된 프로파일 trace(Chrome trace JSON) 다운로드 엔드포인트"""
+    if routes.image_generator is None:
+        return jsonify({
+            "success": False,
+            "error": "모델이 로드되지 않았습니다"
+        }), 503
+
+    denied = check_admin(request.headers.get('X-Admin-Token'), routes.image_generator.config)
+    if denied is not None:
+        return jsonify(denied[0]), denied[1]
+
+    trace_path = routes.image_generator.profiler.trace_path(trace_id)
+    if trace_path is None:
+        return jsonify({
+            "success": False,
+            "error": "프로파일 파일을 찾을 수 없습니다"
+        }), 404
+
+    return await send_file(os.path.abspath(trace_path), mimetype='application/json',
+                           as_attachment=True, download_name=f"{trace_id}.json")
+
+@async_api_bp.route('/images/<filename>', methods=['GET'])
+async def get_saved_image(filename):
+    """저장된 이미지 파일 제공 엔드포인트"""
+    try:
+        if routes.image_generator is None:
+            return jsonify({
+                "success": False,
+                "error": "서비스가 초기화되지 않았습니다"
+            }), 503
+
+        image_path = os.path.join(routes.image_generator.config.OUTPUT_DIR, filename)
+        if not os.path.exists(image_path):
+            return jsonify({
+                "success": False,
+                "error": "이미지 파일을 찾을 수 없습니다"
+            }), 404
+
+        return await send_file(image_path, mimetype='image/png')
+    except Exception as e:
+        logger.error(f"이미지 파일 제공 중 오류: {str(e)}")
+        return jsonify({
+            "success": False,
+            "error": "이미지 파일을 제공할 수 없습니다"
+        }), 500
+
+@async_api_bp.errorhandler(413)
+async def request_entity_too_large(error):
+    """파일 크기 초과 오류 핸들러"""
+    return jsonify({
+        "success": False,
+        "error": "요청 크기가 너무 큽니다 (최대 16MB)"
+    }), 413
+
+@async_api_bp.errorhandler(500)
+async def internal_server_error(error):
+    """내부 서버 오류 핸들러"""
+    return jsonify({
+        "success": False,
+        "error": "내부 서버 오류가 발생했습니다"
+    }), 500
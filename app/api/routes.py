@@ -1,14 +1,17 @@
 """
 API Routes for Qwen Image Generator
 """
-from flask import Blueprint, request, jsonify, send_file
-from werkzeug.exceptions import BadRequest
+from flask import Blueprint, Response, request, jsonify, send_file
+from werkzeug.exceptions import BadRequest, HTTPException
+import base64
+import hmac
 import logging
 import os
-import uuid
 from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
 from ..core.model import QwenImageGenerator
 from ..core.config import Config
+from ..core.feature_cache import resolve_acceleration
 
 logger = logging.getLogger(__name__)
 
@@ -19,6 +22,9 @@ api_bp = Blueprint('api', __name__)
 image_generator = None
 model_loading = False
 
+# Supported /generate response bodies ('png' streams the raw image bytes)
+RESPONSE_FORMATS = ('json', 'png')
+
 def init_model(config: Config):
     """Initialize the image generator model"""
     global image_generator, model_loading
@@ -38,6 +44,186 @@ def init_model(config: Config):
         logger.error(f"모델 초기화 실패: {str(e)}")
         raise
 
+def parse_generate_request(data: Optional[Dict[str, Any]], config: Config) -> Dict[str, Any]:
+    """
+    이미지 생성 요청 데이터를 검증하고 파라미터를 추출합니다
+    
+    Args:
+        data: 요청 JSON 데이터
+        config: Configuration object
+    
+    Returns:
+        generate_image()에 전달할 파라미터와 response_format 값
+    
+    Raises:
+        ValueError: 파라미터가 유효하지 않은 경우
+    """
+    if not isinstance(data, dict):
+        raise ValueError("JSON 객체 형식의 데이터가 필요합니다")
+    
+    # Validate required parameters
+    prompt = data.get('prompt')
+    if not isinstance(prompt, str) or not prompt.strip():
+        raise ValueError("프롬프트가 필요합니다")
+    
+    # Extract optional parameters
+    width = data.get('width')
+    height = data.get('height')
+    num_inference_steps = data.get('num_inference_steps')
+    
+    # Validate parameters
+    if width is not None:
+        if not isinstance(width, int) or width < config.MIN_DIMENSION or width > config.MAX_WIDTH:
+            raise ValueError(f"width는 {config.MIN_DIMENSION}-{config.MAX_WIDTH} 사이의 정수여야 합니다")
+    
+    if height is not None:
+        if not isinstance(height, int) or height < config.MIN_DIMENSION or height > config.MAX_HEIGHT:
+            raise ValueError(f"height는 {config.MIN_DIMENSION}-{config.MAX_HEIGHT} 사이의 정수여야 합니다")
+    
+    if num_inference_steps is not None:
+        if not isinstance(num_inference_steps, int) or num_inference_steps < 1 or num_inference_steps > config.MAX_STEPS:
+            raise ValueError(f"num_inference_steps는 1-{config.MAX_STEPS} 사이의 정수여야 합니다")
+    
+    draft = data.get('draft', False)
+    num_drafts = data.get('num_drafts', 1)
+    if not isinstance(draft, bool):
+        raise ValueError("draft는 true 또는 false여야 합니다")
+    if not isinstance(num_drafts, int) or isinstance(num_drafts, bool) or num_drafts < 1 or num_drafts > config.MAX_DRAFTS:
+        raise ValueError(f"num_drafts는 1-{config.MAX_DRAFTS} 사이의 정수여야 합니다")
+    
+    response_format = parse_response_format(data)
+    if draft and num_drafts > 1 and response_format == 'png':
+        # A single PNG body cannot carry the other drafts (or their ids)
+        raise ValueError("num_drafts가 2 이상이면 response_format은 json이어야 합니다")
+    
+    # Validates preset names and per-request cache settings
+    acceleration = data.get('acceleration')
+    resolve_acceleration(acceleration, config)
+    
+    return {
+        "prompt": prompt,
+        "negative_prompt": data.get('negative_prompt'),
+        "width": width,
+        "height": height,
+        "num_inference_steps": num_inference_steps,
+        "guidance_scale": data.get('guidance_scale'),
+        "seed": data.get('seed'),
+        "acceleration": acceleration,
+        "save_image": data.get('save_image', False),
+        "draft": draft,
+        "num_drafts": num_drafts,
+        "response_format": response_format
+    }
+
+def parse_refine_request(data: Optional[Dict[str, Any]], config: Config) -> Dict[str, Any]:
+    """
+    초안 개선 요청 데이터를 검증하고 파라미터를 추출합니다
+    
+    Args:
+        data: 요청 JSON 데이터
+        config: Configuration object
+    
+    Returns:
+        refine_image()에 전달할 파라미터와 response_format 값
+    
+    Raises:
+        ValueError: 파라미터가 유효하지 않은 경우
+    """
+    if not isinstance(data, dict):
+        raise ValueError("JSON 객체 형식의 데이터가 필요합니다")
+    
+    draft_id = data.get('draft_id')
+    if not isinstance(draft_id, str) or not draft_id:
+        raise ValueError("draft_id가 필요합니다")
+    
+    prompt = data.get('prompt')
+    if prompt is not None and (not isinstance(prompt, str) or not prompt.strip()):
+        raise ValueError("prompt는 비어 있지 않은 문자열이어야 합니다")
+    
+    scale = data.get('scale')
+    if scale is not None:
+        if not isinstance(scale, (int, float)) or isinstance(scale, bool) or scale < 1 or scale > config.MAX_REFINE_SCALE:
+            raise ValueError(f"scale은 1-{config.MAX_REFINE_SCALE} 사이의 숫자여야 합니다")
+    
+    strength = data.get('strength')
+    if strength is not None:
+        if not isinstance(strength, (int, float)) or isinstance(strength, bool) or strength <= 0 or strength > 1:
+            raise ValueError("strength는 0보다 크고 1 이하인 숫자여야 합니다")
+    
+    num_inference_steps = data.get('num_inference_steps')
+    if num_inference_steps is not None:
+        if not isinstance(num_inference_steps, int) or num_inference_steps < 1 or num_inference_steps > config.MAX_STEPS:
+            raise ValueError(f"num_inference_steps는 1-{config.MAX_STEPS} 사이의 정수여야 합니다")
+    
+    response_format = parse_response_format(data)
+    
+    acceleration = data.get('acceleration')
+    resolve_acceleration(acceleration, config)
+    
+    return {
+        "draft_id": draft_id,
+        "prompt": prompt,
+        "negative_prompt": data.get('negative_prompt'),
+        "scale": float(scale) if scale is not None else None,
+        "strength": float(strength) if strength is not None else None,
+        "num_inference_steps": num_inference_steps,
+        "guidance_scale": data.get('guidance_scale'),
+        "seed": data.get('seed'),
+        "acceleration": acceleration,
+        "save_image": data.get('save_image', False),
+        "response_format": response_format
+    }
+
+def parse_response_format(data: Dict[str, Any]) -> str:
+    """response_format 값을 검증합니다"""
+    response_format = data.get('response_format', 'json')
+    if response_format not in RESPONSE_FORMATS:
+        raise ValueError(f"response_format은 {', '.join(RESPONSE_FORMATS)} 중 하나여야 합니다")
+    return response_format
+
+def check_admin(token: Optional[str], config: Config) -> Optional[Tuple[Dict[str, Any], int]]:
+    """
+    관리자 토큰을 확인합니다
+    
+    Returns:
+        거부해야 하면 (응답 데이터, 상태 코드), 허용이면 None
+    """
+    if not config.ADMIN_TOKEN:
+        return {"success": False, "error": "관리자 기능이 비활성화되어 있습니다"}, 404
+    if not token or not hmac.compare_digest(token, config.ADMIN_TOKEN):
+        return {"success": False, "error": "관리자 권한이 필요합니다"}, 403
+    return None
+
+def parse_profile_request(data: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    프로파일링 설정 요청을 검증합니다
+    
+    Returns:
+        RequestProfiler.arm()에 전달할 파라미터, 비활성화 요청이면 빈 딕셔너리
+    
+    Raises:
+        ValueError: 파라미터가 유효하지 않은 경우
+    """
+    data = data or {}
+    if not isinstance(data, dict):
+        raise ValueError("JSON 객체 형식의 데이터가 필요합니다")
+    if data.get('enabled') is False:
+        return {}
+    
+    count = data.get('count')
+    sample_rate = data.get('sample_rate')
+    if count is not None and (not isinstance(count, int) or isinstance(count, bool) or count < 1 or count > 100):
+        raise ValueError("count는 1-100 사이의 정수여야 합니다")
+    if sample_rate is not None and (not isinstance(sample_rate, (int, float)) or isinstance(sample_rate, bool)
+                                    or sample_rate <= 0 or sample_rate > 1):
+        raise ValueError("sample_rate는 0보다 크고 1 이하인 숫자여야 합니다")
+    
+    return {
+        "count": count,
+        "sample_rate": float(sample_rate) if sample_rate is not None else None,
+        "stack_sampling": bool(data.get('stack_sampling', True))
+    }
+
 @api_bp.route('/health', methods=['GET'])
 def health_check():
     """헬스 체크 엔드포인트"""
@@ -91,86 +277,34 @@ def generate_image():
         
         data = request.get_json()
         
-        # Validate required parameters
-        prompt = data.get('prompt')
-        if not prompt or not prompt.strip():
+        try:
+            params = parse_generate_request(data, image_generator.config)
+        except ValueError as e:
             return jsonify({
                 "success": False,
-                "error": "프롬프트가 필요합니다"
+                "error": str(e)
             }), 400
         
-        # Extract optional parameters
-        negative_prompt = data.get('negative_prompt')
-        width = data.get('width')
-        height = data.get('height')
-        num_inference_steps = data.get('num_inference_steps')
-        guidance_scale = data.get('guidance_scale')
-        seed = data.get('seed')
-        save_image = data.get('save_image', False)
-        
-        # Validate parameters
-        config = image_generator.config
-        
-        if width is not None:
-            if not isinstance(width, int) or width < config.MIN_DIMENSION or width > config.MAX_WIDTH:
-                return jsonify({
-                    "success": False,
-                    "error": f"width는 {config.MIN_DIMENSION}-{config.MAX_WIDTH} 사이의 정수여야 합니다"
-                }), 400
-        
-        if height is not None:
-            if not isinstance(height, int) or height < config.MIN_DIMENSION or height > config.MAX_HEIGHT:
-                return jsonify({
-                    "success": False,
-                    "error": f"height는 {config.MIN_DIMENSION}-{config.MAX_HEIGHT} 사이의 정수여야 합니다"
-                }), 400
-        
-        if num_inference_steps is not None:
-            if not isinstance(num_inference_steps, int) or num_inference_steps < 1 or num_inference_steps > config.MAX_STEPS:
-                return jsonify({
-                    "success": False,
-                    "error": f"num_inference_steps는 1-{config.MAX_STEPS} 사이의 정수여야 합니다"
-                }), 400
+        prompt = params["prompt"]
+        response_format = params.pop("response_format")
         
         logger.info(f"이미지 생성 요청: {prompt[:100]}...")
         
         # Generate image
-        result = image_generator.generate_image(
-            prompt=prompt,
-            negative_prompt=negative_prompt,
-            width=width,
-            height=height,
-            num_inference_steps=num_inference_steps,
-            guidance_scale=guidance_scale,
-            seed=seed
-        )
+        result = image_generator.generate_image(**params)
         
         if not result["success"]:
             return jsonify(result), 500
         
-        response_data = {
-            "success": True,
-            "prompt": result["prompt"],
-            "negative_prompt": result["negative_prompt"],
-            "width": result["width"],
-            "height": result["height"],
-            "num_inference_steps": result["num_inference_steps"],
-            "guidance_scale": result["guidance_scale"],
-            "seed": result["seed"],
-            "timestamp": datetime.now().isoformat()
-        }
-        
-        # Save image option
-        if save_image:
-            filename = f"generated_{uuid.uuid4().hex[:8]}.png"
-            filepath = image_generator.save_image(result["image_base64"], filename)
-            response_data["saved_path"] = filepath
-            response_data["filename"] = filename
-        
-        # Include base64 image
-        response_data["image_base64"] = result["image_base64"]
+        response_data = build_generate_response(result)
         
         logger.info("이미지 생성 요청 완료")
+        if response_format == 'png':
+            return Response(
+                base64.b64decode(response_data["image_base64"]),
+                mimetype='image/png',
+                headers=build_image_headers(response_data)
+            )
         return jsonify(response_data), 200
         
     except BadRequest as e:
@@ -178,6 +312,9 @@ def generate_image():
             "success": False,
             "error": str(e)
         }), 400
+    except HTTPException:
+        # Let the blueprint error handlers answer (e.g. 413 for oversized bodies)
+        raise
     except Exception as e:
         logger.error(f"이미지 생성 중 오류: {str(e)}")
         return jsonify({
@@ -185,6 +322,128 @@ def generate_image():
             "error": "내부 서버 오류가 발생했습니다"
         }), 500
 
+def build_generate_response(result: Dict[str, Any]) -> Dict[str, Any]:
+    """생성 결과로부터 응답 데이터를 구성합니다"""
+    response_data = {
+        "success": True,
+        "prompt": result["prompt"],
+        "negative_prompt": result["negative_prompt"],
+        "width": result["width"],
+        "height": result["height"],
+        "num_inference_steps": result["num_inference_steps"],
+        "guidance_scale": result["guidance_scale"],
+        "seed": result["seed"],
+        "timestamp": datetime.now().isoformat()
+    }
+    
+    # Optional fields (acceleration stats, draft/refine bookkeeping)
+    for key in ("acceleration", "draft_id", "drafts", "refined_from", "strength"):
+        if result.get(key) is not None:
+            response_data[key] = result[key]
+    
+    # Saved image location (generate_image(save_image=True))
+    if result.get("saved_path"):
+        response_data["saved_path"] = result["saved_path"]
+        response_data["filename"] = result["filename"]
+    
+    # Include base64 image
+    response_data["image_base64"] = result["image_base64"]
+    
+    return response_data
+
+def build_image_headers(response_data: Dict[str, Any]) -> Dict[str, str]:
+    """PNG 응답에 생성 파라미터를 담을 헤더를 구성합니다"""
+    headers = {
+        "X-Image-Width": str(response_data["width"]),
+        "X-Image-Height": str(response_data["height"]),
+        "X-Image-Steps": str(response_data["num_inference_steps"]),
+        "X-Image-Seed": "" if response_data["seed"] is None else str(response_data["seed"])
+    }
+    if response_data.get("filename"):
+        headers["X-Image-Filename"] = response_data["filename"]
+    if response_data.get("draft_id"):
+        headers["X-Draft-Id"] = response_data["draft_id"]
+    return headers
+
+@api_bp.route('/refine', methods=['POST'])
+def refine_image():
+    """초안 잠재 텐서를 업스케일하고 이어서 디노이징하는 엔드포인트"""
+    global image_generator
+    
+    # Check model loading status
+    if model_loading:
+        return jsonify({
+            "success": False,
+            "error": "모델을 로딩 중입니다. 잠시 후 다시 시도하세요.",
+            "status": "loading"
+        }), 202
+    
+    if image_generator is None:
+        return jsonify({
+            "success": False,
+            "error": "모델이 로드되지 않았습니다. 서버를 재시작하세요.",
+            "status": "error"
+        }), 503
+    
+    try:
+        # Parse request data
+        if not request.is_json:
+            raise BadRequest("JSON 형식의 데이터가 필요합니다")
+        
+        try:
+            params = parse_refine_request(request.get_json(), image_generator.config)
+        except ValueError as e:
+            return jsonify({
+                "success": False,
+                "error": str(e)
+            }), 400
+        
+        response_format = params.pop("response_format")
+        
+        logger.info(f"초안 개선 요청: {params['draft_id']}")
+        
+        try:
+            result = image_generator.refine_image(**params)
+        except KeyError:
+            return jsonify({
+                "success": False,
+                "error": "초안을 찾을 수 없습니다 (만료되었거나 제거됨)"
+            }), 404
+        except ValueError as e:
+            return jsonify({
+                "success": False,
+                "error": str(e)
+            }), 400
+        
+        if not result["success"]:
+            return jsonify(result), 500
+        
+        response_data = build_generate_response(result)
+        
+        logger.info("초안 개선 요청 완료")
+        if response_format == 'png':
+            return Response(
+                base64.b64decode(response_data["image_base64"]),
+                mimetype='image/png',
+                headers=build_image_headers(response_data)
+            )
+        return jsonify(response_data), 200
+        
+    except BadRequest as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
+    except HTTPException:
+        # Let the blueprint error handlers answer (e.g. 413 for oversized bodies)
+        raise
+    except Exception as e:
+        logger.error(f"초안 개선 중 오류: {str(e)}")
+        return jsonify({
+            "success": False,
+            "error": "내부 서버 오류가 발생했습니다"
+        }), 500
+
 @api_bp.route('/model-info', methods=['GET'])
 def get_model_info():
     """모델 정보 조회 엔드포인트"""
@@ -210,6 +469,57 @@ def get_model_info():
             "error": "모델 정보를 가져올 수 없습니다"
         }), 500
 
+@api_bp.route('/debug/profile', methods=['GET', 'POST'])
+def debug_profile():
+    """다음 요청들의 프로파일링을 설정하거나 상태를 조회하는 관리자 엔드포인트"""
+    if image_generator is None:
+        return jsonify({
+            "success": False,
+            "error": "모델이 로드되지 않았습니다"
+        }), 503
+    
+    denied = check_admin(request.headers.get('X-Admin-Token'), image_generator.config)
+    if denied is not None:
+        return jsonify(denied[0]), denied[1]
+    
+    profiler = image_generator.profiler
+    if request.method == 'GET':
+        return jsonify({"success": True, "profiler": profiler.status()}), 200
+    
+    try:
+        options = parse_profile_request(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
+    
+    status = profiler.arm(**options) if options else profiler.disarm()
+    return jsonify({"success": True, "profiler": status}), 200
+
+@api_bp.route('/debug/profile/<trace_id>', methods=['GET'])
+def download_profile(trace_id):
+    """저장된 프로파일 trace(Chrome trace JSON) 다운로드 엔드포인트"""
+    if image_generator is None:
+        return jsonify({
+            "success": False,
+            "error": "모델이 로드되지 않았습니다"
+        }), 503
+    
+    denied = check_admin(request.headers.get('X-Admin-Token'), image_generator.config)
+    if denied is not None:
+        return jsonify(denied[0]), denied[1]
+    
+    trace_path = image_generator.profiler.trace_path(trace_id)
+    if trace_path is None:
+        return jsonify({
+            "success": False,
+            "error": "프로파일 파일을 찾을 수 없습니다"
+        }), 404
+    
+    return send_file(os.path.abspath(trace_path), mimetype='application/json',
+                     as_attachment=True, download_name=f"{trace_id}.json")
+
 @api_bp.route('/images/<filename>', methods=['GET'])
 def get_saved_image(filename):
     """저장된 이미지 파일 제공 엔드포인트"""
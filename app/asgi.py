@@ -0,0 +1,103 @@
+"""
+Async (ASGI) Application Entry Point
+"""
+from quart import Quart
+import asyncio
+import logging
+import signal
+import threading
+from .core.config import config
+from .core.gpu_executor import GPUExecutor
+from .api import async_routes
+from .api.async_routes import async_api_bp
+from .api.routes import init_model
+from .main import setup_logging
+
+logger = logging.getLogger(__name__)
+
+def create_async_app(config_name='default'):
+    """
+    Quart(ASGI) 애플리케이션 팩토리 함수
+
+    Args:
+        config_name: 설정 이름 ('development', 'production', 'default')
+
+    Returns:
+        Quart 애플리케이션 인스턴스
+    """
+    app = Quart(__name__)
+
+    # Load configuration
+    app_config = config[config_name]
+    app.config.from_object(app_config)
+
+    # Request size and body read limits
+    app.config['MAX_CONTENT_LENGTH'] = app_config.MAX_CONTENT_LENGTH
+    app.config['BODY_TIMEOUT'] = app_config.BODY_TIMEOUT
+
+    # Initialize logging
+    setup_logging(app_config)
+
+    # Initialize directories
+    app_config.init_directories()
+
+    # Register blueprints
+    app.register_blueprint(async_api_bp)
+
+    # Dedicated executor for GPU work
+    gpu_executor = GPUExecutor(app_config)
+    async_routes.init_executor(gpu_executor, app_config)
+
+    @app.after_serving
+    async def shutdown_executor():
+        """진행 중인 GPU 작업이 끝날 때까지 기다린 뒤 실행기를 종료합니다"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, gpu_executor.shutdown)
+
+    # Initialize model in background thread
+    if not app.config.get('TESTING', False):
+        model_thread = threading.Thread(target=init_model, args=(app_config,))
+        model_thread.daemon = True
+        model_thread.start()
+
+    return app
+
+def run_async(config_name='default'):
+    """
+    Hypercorn으로 비동기 서버를 실행합니다
+
+    SIGTERM/SIGINT를 받으면 새 연결과 생성 요청을 거부하고,
+    GRACEFUL_TIMEOUT 동안 진행 중인 요청이 끝나기를 기다린 뒤 종료합니다.
+    """
+    from hypercorn.asyncio import serve
+    from hypercorn.config import Config as HypercornConfig
+
+    app = create_async_app(config_name)
+    app_config = config[config_name]
+
+    server_config = HypercornConfig()
+    server_config.bind = [f"{app_config.HOST}:{app_config.PORT}"]
+    server_config.keep_alive_timeout = app_config.KEEP_ALIVE_TIMEOUT
+    server_config.graceful_timeout = app_config.GRACEFUL_TIMEOUT
+    server_config.read_timeout = app_config.BODY_TIMEOUT
+    server_config.accesslog = None
+
+    async def _serve():
+        shutdown_event = asyncio.Event()
+
+        def _on_signal(signum):
+            logger.info(f"종료 신호 수신: {signal.Signals(signum).name}")
+            async_routes.begin_drain()
+            shutdown_event.set()
+
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(signum, _on_signal, signum)
+
+        await serve(app, server_config, shutdown_trigger=shutdown_event.wait)
+
+    logger.info(f"비동기 서버 시작...")
+    logger.info(f"주소: http://{app_config.HOST}:{app_config.PORT}")
+    logger.info(f"헬스체크: http://{app_config.HOST}:{app_config.PORT}/health")
+
+    asyncio.run(_serve())
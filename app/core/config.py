@@ -11,6 +11,22 @@ class Config:
     PORT = int(os.environ.get('PORT', 5000))
     DEBUG = os.environ.get('DEBUG', 'False').lower() == 'true'
     
+    # Serving mode ('flask': development server, 'async': ASGI server)
+    SERVER_MODE = os.environ.get('SERVER_MODE', 'flask').lower()
+    KEEP_ALIVE_TIMEOUT = int(os.environ.get('KEEP_ALIVE_TIMEOUT', 75))
+    GRACEFUL_TIMEOUT = int(os.environ.get('GRACEFUL_TIMEOUT', 600))
+    BODY_TIMEOUT = int(os.environ.get('BODY_TIMEOUT', 60))
+    
+    # GPU work queue
+    GPU_WORKERS = int(os.environ.get('GPU_WORKERS', 1))
+    GPU_QUEUE_LIMIT = int(os.environ.get('GPU_QUEUE_LIMIT', 16))
+    RETRY_AFTER_SECONDS = int(os.environ.get('RETRY_AFTER_SECONDS', 10))
+    
+    # Pipelined post-processing (PNG encode/base64/save in a process pool, async mode)
+    PIPELINE_POSTPROCESS = os.environ.get('PIPELINE_POSTPROCESS', 'True').lower() == 'true'
+    POSTPROCESS_WORKERS = int(os.environ.get('POSTPROCESS_WORKERS', 2))
+    POSTPROCESS_QUEUE_LIMIT = int(os.environ.get('POSTPROCESS_QUEUE_LIMIT', 4))
+    
     # Model settings
     MODEL_NAME = os.environ.get('MODEL_NAME', 'Qwen/Qwen2-VL-7B-Instruct')
     FALLBACK_MODEL = os.environ.get('FALLBACK_MODEL', 'stabilityai/stable-diffusion-xl-base-1.0')
@@ -25,6 +41,27 @@ class Config:
     DEFAULT_STEPS = int(os.environ.get('DEFAULT_STEPS', 20))
     DEFAULT_GUIDANCE = float(os.environ.get('DEFAULT_GUIDANCE', 7.5))
     
+    # Draft-then-refine generation
+    DRAFT_WIDTH = int(os.environ.get('DRAFT_WIDTH', 512))
+    DRAFT_HEIGHT = int(os.environ.get('DRAFT_HEIGHT', 512))
+    DRAFT_STEPS = int(os.environ.get('DRAFT_STEPS', 8))
+    MAX_DRAFTS = int(os.environ.get('MAX_DRAFTS', 8))
+    REFINE_SCALE = float(os.environ.get('REFINE_SCALE', 2.0))
+    MAX_REFINE_SCALE = float(os.environ.get('MAX_REFINE_SCALE', 4.0))
+    REFINE_STRENGTH = float(os.environ.get('REFINE_STRENGTH', 0.5))
+    LATENT_STORE_MAX_ENTRIES = int(os.environ.get('LATENT_STORE_MAX_ENTRIES', 256))
+    LATENT_STORE_MAX_MB = int(os.environ.get('LATENT_STORE_MAX_MB', 512))
+    LATENT_STORE_TTL = int(os.environ.get('LATENT_STORE_TTL', 3600))
+    
+    # Feature reuse acceleration (DeepCache-style block caching)
+    DEFAULT_ACCELERATION = os.environ.get('DEFAULT_ACCELERATION', 'none')
+    FEATURE_CACHE_BASE_PRESET = 'balanced'
+    FEATURE_CACHE_PRESETS = {
+        'none': None,
+        'balanced': {'interval': 2, 'depth': 1, 'warmup_steps': 2, 'guard_every': 4, 'max_drift': 0.15},
+        'fast': {'interval': 3, 'depth': 1, 'warmup_steps': 1, 'guard_every': 6, 'max_drift': 0.25},
+    }
+    
     # Limits
     MAX_WIDTH = int(os.environ.get('MAX_WIDTH', 2048))
     MAX_HEIGHT = int(os.environ.get('MAX_HEIGHT', 2048))
@@ -35,6 +72,12 @@ class Config:
     OUTPUT_DIR = os.environ.get('OUTPUT_DIR', 'generated_images')
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB
     
+    # Profiling (/debug/profile, disabled unless ADMIN_TOKEN is set)
+    ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN', '')
+    PROFILE_DIR = os.environ.get('PROFILE_DIR', 'profiles')
+    PROFILE_MAX_TRACES = int(os.environ.get('PROFILE_MAX_TRACES', 20))
+    PROFILE_SAMPLE_INTERVAL_MS = float(os.environ.get('PROFILE_SAMPLE_INTERVAL_MS', 5))
+    
     # GPU settings
     USE_CUDA = os.environ.get('USE_CUDA', 'True').lower() == 'true'
     TORCH_DTYPE = os.environ.get('TORCH_DTYPE', 'float16')
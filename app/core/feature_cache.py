@@ -0,0 +1,313 @@
+"""
+Feature Reuse Acceleration (DeepCache-style block caching)
+
+인접한 디노이징 단계의 깊은 블록 출력은 거의 변하지 않으므로,
+정해진 주기로만 전체 UNet을 계산하고 나머지 단계에서는 깊은 블록
+(down_blocks[depth:], mid_block, up_blocks[:-depth])의 출력을 재사용합니다.
+얕은 블록은 매 단계 다시 계산되므로 세부 묘사는 유지됩니다.
+"""
+import logging
+import threading
+import weakref
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Union
+import torch
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+# One lock per denoiser: forward patching must not interleave between concurrent requests
+_denoiser_locks: "weakref.WeakKeyDictionary[torch.nn.Module, threading.Lock]" = weakref.WeakKeyDictionary()
+_denoiser_locks_guard = threading.Lock()
+
+def _denoiser_lock(denoiser: torch.nn.Module) -> threading.Lock:
+    """디노이저별 패치 잠금을 반환합니다"""
+    with _denoiser_locks_guard:
+        lock = _denoiser_locks.get(denoiser)
+        if lock is None:
+            lock = _denoiser_locks[denoiser] = threading.Lock()
+        return lock
+
+# Accepted keys for a per-request acceleration dict and their types
+ACCELERATION_KEYS = {
+    "interval": int,
+    "depth": int,
+    "warmup_steps": int,
+    "guard_every": int,
+    "max_drift": float,
+}
+
+def resolve_acceleration(
+    acceleration: Optional[Union[str, Dict[str, Any]]],
+    config: Config
+) -> Optional[Dict[str, Any]]:
+    """
+    가속 설정(프리셋 이름 또는 딕셔너리)을 검증하고 설정 딕셔너리로 변환합니다
+
+    Args:
+        acceleration: 프리셋 이름, 설정 딕셔너리 또는 None (기본 프리셋 사용)
+        config: Configuration object
+
+    Returns:
+        FeatureCache 생성 인자 딕셔너리, 가속을 사용하지 않으면 None
+
+    Raises:
+        ValueError: 알 수 없는 프리셋이거나 설정 값이 유효하지 않은 경우
+    """
+    presets = config.FEATURE_CACHE_PRESETS
+
+    if acceleration is None:
+        acceleration = config.DEFAULT_ACCELERATION
+
+    if isinstance(acceleration, str):
+        if acceleration not in presets:
+            raise ValueError(f"acceleration은 {', '.join(presets)} 중 하나여야 합니다")
+        preset = presets[acceleration]
+        return dict(preset) if preset is not None else None
+
+    if not isinstance(acceleration, dict):
+        raise ValueError("acceleration은 프리셋 이름 또는 객체여야 합니다")
+
+    settings = dict(presets[config.FEATURE_CACHE_BASE_PRESET])
+    for key, value in acceleration.items():
+        expected = ACCELERATION_KEYS.get(key)
+        if expected is None:
+            raise ValueError(f"알 수 없는 acceleration 설정: {key}")
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f"acceleration.{key}는 숫자여야 합니다")
+        if expected is int and not isinstance(value, int):
+            raise ValueError(f"acceleration.{key}는 정수여야 합니다")
+        settings[key] = expected(value)
+
+    if settings["interval"] < 1 or settings["depth"] < 1:
+        raise ValueError("acceleration.interval과 acceleration.depth는 1 이상이어야 합니다")
+    if settings["warmup_steps"] < 0 or settings["guard_every"] < 0 or settings["max_drift"] <= 0:
+        raise ValueError("acceleration.warmup_steps, guard_every는 0 이상, max_drift는 0보다 커야 합니다")
+
+    # interval 1 means every step is a full step
+    return settings if settings["interval"] > 1 else None
+
+class FeatureCache:
+    """디노이저의 깊은 블록 출력을 단계 간에 재사용하는 클래스"""
+
+    def __init__(
+        self,
+        denoiser: torch.nn.Module,
+        interval: int = 3,
+        depth: int = 1,
+        warmup_steps: int = 1,
+        guard_every: int = 4,
+        max_drift: float = 0.15
+    ):
+        """
+        Initialize the feature cache
+
+        Args:
+            denoiser: UNet 형태의 디노이저 (down_blocks/mid_block/up_blocks 보유)
+            interval: 전체 계산 주기 (interval 단계마다 1번 전체 계산)
+            depth: 매 단계 다시 계산할 얕은 블록 수
+            warmup_steps: 캐시 없이 전체 계산할 초기 단계 수
+            guard_every: 몇 번째 캐시 단계마다 전체 계산과 비교할지 (0이면 비활성화)
+            max_drift: 허용 상대 오차, 초과하면 남은 단계는 전체 계산
+        """
+        if not self.supports(denoiser):
+            raise ValueError("블록 캐싱을 지원하지 않는 디노이저입니다")
+
+        self.denoiser = denoiser
+        self.interval = interval
+        self.depth = min(depth, len(denoiser.down_blocks) - 1)
+        self.warmup_steps = warmup_steps
+        self.guard_every = guard_every
+        self.max_drift = max_drift
+
+        self.blocks = self._select_deep_blocks()
+        self._caches: List[Dict[int, Any]] = [{} for _ in self.blocks]
+        self._originals: List[Any] = []
+        self._owner: Optional[int] = None
+        self._reset_run_state()
+
+    @staticmethod
+    def supports(denoiser: Optional[torch.nn.Module]) -> bool:
+        """블록 캐싱이 가능한 디노이저인지 확인합니다"""
+        return (
+            denoiser is not None
+            and hasattr(denoiser, "down_blocks")
+            and hasattr(denoiser, "up_blocks")
+            and len(denoiser.down_blocks) > 1
+        )
+
+    def _select_deep_blocks(self) -> List[torch.nn.Module]:
+        """재사용 대상이 되는 깊은 블록 목록을 반환합니다"""
+        blocks = list(self.denoiser.down_blocks[self.depth:])
+        if getattr(self.denoiser, "mid_block", None) is not None:
+            blocks.append(self.denoiser.mid_block)
+        blocks.extend(self.denoiser.up_blocks[:len(self.denoiser.up_blocks) - self.depth])
+        return blocks
+
+    def _reset_run_state(self) -> None:
+        """생성 1회 단위 상태를 초기화합니다"""
+        for cache in self._caches:
+            cache.clear()
+        self._mode = "full"
+        self._step = -1
+        self._slot = 0
+        self._last_timestep = None
+        self._last_full_step = -1
+        self._cached_since_guard = 0
+        self._fallback = False
+        self.full_steps = 0
+        self.cached_steps = 0
+        self.guard_steps = 0
+        self.drifts: List[float] = []
+
+    def _advance(self, timestep: Any) -> None:
+        """
+        디노이저 호출을 단계 단위로 묶습니다
+
+        CFG를 배치하지 않는 파이프라인은 한 단계에서 여러 번 호출하므로,
+        같은 timestep의 호출은 같은 단계의 서로 다른 슬롯으로 취급합니다.
+        """
+        key = timestep.item() if isinstance(timestep, torch.Tensor) and timestep.numel() == 1 else timestep
+        if isinstance(key, torch.Tensor):
+            key = tuple(key.flatten().tolist())
+        if self._step < 0 or key != self._last_timestep:
+            self._step += 1
+            self._slot = 0
+            self._last_timestep = key
+        else:
+            self._slot += 1
+
+    def _plan_step(self) -> str:
+        """현재 단계의 실행 방식을 결정합니다 ('full', 'cached', 'guard')"""
+        has_cache = all(self._slot in cache for cache in self._caches)
+        if self._fallback or not has_cache or self._step < self.warmup_steps:
+            return "full"
+        if self._slot == 0 and (self._step - self._last_full_step) >= self.interval:
+            return "full"
+        if self._slot != 0 and self._last_full_step == self._step:
+            return "full"
+        if self.guard_every and self._cached_since_guard >= self.guard_every:
+            return "guard"
+        return "cached"
+
+    def _wrap_denoiser(self, forward):
+        """디노이저 forward를 단계 스케줄에 따라 실행하도록 감쌉니다"""
+        def cached_forward(*args, **kwargs):
+            # Requests without acceleration running concurrently on other threads bypass the cache
+            if threading.get_ident() != self._owner:
+                return forward(*args, **kwargs)
+
+            timestep = kwargs.get("timestep", args[1] if len(args) > 1 else None)
+            self._advance(timestep)
+            plan = self._plan_step()
+
+            if plan == "cached":
+                self._mode = "cached"
+                if self._slot == 0:
+                    self.cached_steps += 1
+                    self._cached_since_guard += 1
+                return forward(*args, **kwargs)
+
+            if plan == "guard":
+                # Quality guard: run the cached path, then a full step, and compare
+                self._mode = "cached"
+                approx = forward(*args, **kwargs)
+                self._mode = "full"
+                exact = forward(*args, **kwargs)
+                drift = self._relative_drift(approx, exact)
+                self.drifts.append(drift)
+                self._cached_since_guard = 0
+                if self._slot == 0:
+                    self.guard_steps += 1
+                    self.full_steps += 1
+                    self._last_full_step = self._step
+                if drift > self.max_drift:
+                    logger.warning(f"특징 캐시 오차 초과 ({drift:.4f} > {self.max_drift}), 남은 단계는 전체 계산합니다")
+                    self._fallback = True
+                return exact
+
+            self._mode = "full"
+            if self._slot == 0:
+                self.full_steps += 1
+                self._last_full_step = self._step
+            return forward(*args, **kwargs)
+
+        return cached_forward
+
+    def _wrap_block(self, forward, cache: Dict[int, Any]):
+        """깊은 블록 forward를 캐시 모드에 따라 건너뛰도록 감쌉니다"""
+        def cached_forward(*args, **kwargs):
+            if threading.get_ident() != self._owner:
+                return forward(*args, **kwargs)
+            if self._mode == "cached" and self._slot in cache:
+                return cache[self._slot]
+            output = forward(*args, **kwargs)
+            if self._mode == "full":
+                cache[self._slot] = output
+            return output
+
+        return cached_forward
+
+    @staticmethod
+    def _relative_drift(approx: Any, exact: Any) -> float:
+        """캐시 출력과 전체 계산 출력의 상대 L2 오차를 계산합니다"""
+        approx_sample = approx[0] if not isinstance(approx, torch.Tensor) else approx
+        exact_sample = exact[0] if not isinstance(exact, torch.Tensor) else exact
+        diff = (approx_sample.float() - exact_sample.float()).norm()
+        return (diff / exact_sample.float().norm().clamp_min(1e-8)).item()
+
+    def _patch(self, module: torch.nn.Module, wrapper) -> None:
+        """모듈의 forward를 교체하고 복원 정보를 기록합니다
+
+        accelerate의 CPU 오프로드 훅처럼 인스턴스에 이미 설정된 forward도
+        그대로 감싸서 호출합니다.
+        """
+        had_instance_forward = "forward" in module.__dict__
+        self._originals.append((module, had_instance_forward, module.__dict__.get("forward")))
+        module.forward = wrapper(module.forward)
+
+    def _restore(self) -> None:
+        """교체한 forward를 원래대로 되돌립니다"""
+        for module, had_instance_forward, original in reversed(self._originals):
+            if had_instance_forward:
+                module.forward = original
+            else:
+                del module.forward
+        self._originals.clear()
+
+    @contextmanager
+    def attach(self):
+        """
+        생성 1회 동안 디노이저에 블록 캐싱을 적용합니다
+
+        같은 디노이저에 대한 attach는 순서대로 실행되며, 패치된 동안 다른
+        스레드의 호출은 캐시를 거치지 않고 원래 forward로 실행됩니다.
+        """
+        with _denoiser_lock(self.denoiser):
+            self._reset_run_state()
+            self._owner = threading.get_ident()
+            try:
+                for block, cache in zip(self.blocks, self._caches):
+                    self._patch(block, lambda forward, cache=cache: self._wrap_block(forward, cache))
+                self._patch(self.denoiser, self._wrap_denoiser)
+                yield self
+            finally:
+                self._restore()
+                self._owner = None
+                for cache in self._caches:
+                    cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """가속 통계를 반환합니다"""
+        total = self.full_steps + self.cached_steps
+        return {
+            "mode": "feature_cache",
+            "interval": self.interval,
+            "depth": self.depth,
+            "full_steps": self.full_steps,
+            "cached_steps": self.cached_steps,
+            "guard_steps": self.guard_steps,
+            "cached_ratio": round(self.cached_steps / total, 4) if total else 0.0,
+            "max_drift": round(max(self.drifts), 6) if self.drifts else None,
+            "fallback": self._fallback
+        }
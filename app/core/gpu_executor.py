@@ -0,0 +1,293 @@
+"""
+GPU Work Executor
+
+GPU 단계(디노이징 + VAE 디코딩)는 전용 스레드에서, 후처리 단계(PNG 인코딩,
+base64, 저장)는 프로세스 풀에서 실행하여 두 단계를 겹칩니다. GPU 스레드는
+이미지를 후처리 단계에 넘기자마자 다음 작업의 디노이징을 시작합니다.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+from .config import Config
+from .postprocess import encode_png
+
+logger = logging.getLogger(__name__)
+
+class QueueFullError(RuntimeError):
+    """GPU 작업 대기열이 가득 찼을 때 발생하는 예외"""
+
+class StageStats:
+    """파이프라인 단계 1개의 처리량과 사용률 통계"""
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self.pending = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self.blocked_seconds = 0.0
+
+    def snapshot(self, uptime: float) -> Dict[str, Any]:
+        capacity = uptime * self.workers
+        return {
+            "workers": self.workers,
+            "pending": self.pending,
+            "running": self.running,
+            "completed": self.completed,
+            "failed": self.failed,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "blocked_seconds": round(self.blocked_seconds, 3),
+            "utilization": round(self.busy_seconds / capacity, 4) if capacity > 0 else 0.0
+        }
+
+class GPUExecutor:
+    """GPU 작업을 이벤트 루프와 분리된 전용 스레드에서 실행하는 클래스"""
+
+    def __init__(self, config: Config):
+        """
+        Initialize the GPU executor
+
+        Args:
+            config: Configuration object
+        """
+        self.config = config
+        self.max_workers = config.GPU_WORKERS
+        self.queue_limit = config.GPU_QUEUE_LIMIT
+        self.pipelined = config.PIPELINE_POSTPROCESS
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix='gpu-worker'
+        )
+        self._lock = threading.Lock()
+        self._gpu = StageStats(self.max_workers)
+        self._post = StageStats(config.POSTPROCESS_WORKERS)
+        self._rejected = 0
+        self._started_at = time.monotonic()
+        self._shutdown = False
+
+        # Post-processing stage: bounded hand-off so a slow CPU stage back-pressures the GPU thread
+        self._post_pool: Optional[ProcessPoolExecutor] = None
+        self._post_slots = threading.BoundedSemaphore(config.POSTPROCESS_QUEUE_LIMIT)
+        if self.pipelined:
+            # spawn: never fork a process that holds a CUDA context
+            self._post_pool = ProcessPoolExecutor(
+                max_workers=config.POSTPROCESS_WORKERS,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+
+    def submit(self, fn: Callable[..., Any], *args, **kwargs) -> Future:
+        """
+        GPU 작업을 대기열에 추가합니다
+
+        Raises:
+            QueueFullError: 대기 중인 작업 수가 한도를 넘은 경우
+            RuntimeError: 실행기가 종료된 경우
+        """
+        self._reserve()
+        future = self._executor.submit(self._run, fn, *args, **kwargs)
+        future.add_done_callback(self._release_if_cancelled)
+        return future
+
+    def _release_if_cancelled(self, future: Future) -> None:
+        """대기 중에 취소된 작업(클라이언트 연결 끊김 등)의 대기열 자리를 반납합니다"""
+        # cancel() only succeeds before _run starts, so _run never releases this slot itself
+        if future.cancelled():
+            with self._lock:
+                self._gpu.pending -= 1
+
+    def submit_image_job(self, fn: Callable[..., Dict[str, Any]], save_image: bool = False, **kwargs) -> Future:
+        """
+        이미지 생성 작업(generate_image/refine_image)을 대기열에 추가합니다
+
+        파이프라인 모드에서는 GPU 스레드가 PIL 이미지만 만들어 postprocess 콜백으로
+        넘기고, PNG 인코딩과 저장은 후처리 프로세스 풀에서 진행됩니다. 반환된
+        Future는 두 단계가 모두 끝나면 완료됩니다.
+
+        Raises:
+            QueueFullError: 대기 중인 작업 수가 한도를 넘은 경우
+            RuntimeError: 실행기가 종료된 경우
+        """
+        if not self.pipelined:
+            return self.submit(fn, save_image=save_image, **kwargs)
+
+        self._reserve()
+        outer: Future = Future()
+        self._executor.submit(self._run_pipelined, outer, fn, save_image, kwargs)
+        return outer
+
+    def _reserve(self) -> None:
+        """대기열 자리를 확보합니다"""
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("GPU 실행기가 종료되었습니다")
+            if self._gpu.pending >= self.queue_limit:
+                self._rejected += 1
+                raise QueueFullError("GPU 작업 대기열이 가득 찼습니다")
+            self._gpu.pending += 1
+
+    def _run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """작업을 실행하고 통계를 갱신합니다"""
+        with self._lock:
+            self._gpu.pending -= 1
+            self._gpu.running += 1
+
+        start = time.monotonic()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            with self._lock:
+                self._gpu.failed += 1
+            raise
+        else:
+            with self._lock:
+                self._gpu.completed += 1
+            return result
+        finally:
+            with self._lock:
+                self._gpu.running -= 1
+                self._gpu.busy_seconds += time.monotonic() - start
+
+    def _run_pipelined(self, outer: Future, fn: Callable[..., Dict[str, Any]],
+                       save_image: bool, kwargs: Dict[str, Any]) -> None:
+        """GPU 단계를 실행하고, fn이 넘겨준 이미지를 후처리 단계로 보냅니다"""
+        if not outer.set_running_or_notify_cancel():
+            with self._lock:
+                self._gpu.pending -= 1
+            return
+
+        handed_off = False
+
+        def postprocess(response: Dict[str, Any], images: List[Any]) -> None:
+            nonlocal handed_off
+            if images:
+                self._handoff(outer, response, images, save_image)
+                handed_off = True
+
+        try:
+            result = self._run(fn, postprocess=postprocess, **kwargs)
+        except BaseException as e:
+            if not handed_off:
+                outer.set_exception(e)
+            return
+
+        # Failed (or produced no image) before the hand-off: nothing left for the CPU stage
+        if not handed_off:
+            outer.set_result(result)
+
+    def _handoff(self, outer: Future, result: Dict[str, Any], images: List[Any], save_image: bool) -> None:
+        """이미지를 후처리 단계에 넘깁니다 (GPU 스레드에서 fn 실행 중에 호출됨)"""
+        # Blocks only when POSTPROCESS_QUEUE_LIMIT jobs are already waiting on the CPU stage
+        wait_start = time.monotonic()
+        self._post_slots.acquire()
+        waited = time.monotonic() - wait_start
+        with self._lock:
+            # The wait happens inside fn; count it as blocked rather than busy GPU time
+            self._gpu.blocked_seconds += waited
+            self._gpu.busy_seconds -= waited
+            self._post.pending += 1
+
+        try:
+            self._start_postprocess(outer, result, images, save_image)
+        except BaseException:
+            self._post_slots.release()
+            with self._lock:
+                self._post.pending -= 1
+                self._post.failed += 1
+            raise
+
+    def _start_postprocess(self, outer: Future, result: Dict[str, Any],
+                           images: List[Any], save_image: bool) -> None:
+        """이미지별 인코딩 작업을 프로세스 풀에 제출하고 완료 시 결과를 조립합니다"""
+        save_paths: List[Optional[str]] = [None] * len(images)
+        if save_image:
+            filename = f"generated_{uuid.uuid4().hex[:8]}.png"
+            save_paths[0] = os.path.join(self.config.OUTPUT_DIR, filename)
+            result["saved_path"] = save_paths[0]
+            result["filename"] = filename
+
+        futures = [
+            self._post_pool.submit(encode_png, image.mode, image.size, image.tobytes(), path)
+            for image, path in zip(images, save_paths)
+        ]
+        with self._lock:
+            self._post.pending -= 1
+            self._post.running += 1
+        remaining = [len(futures)]
+
+        def on_done(_future: Future) -> None:
+            with self._lock:
+                remaining[0] -= 1
+                if remaining[0] > 0:
+                    return
+            self._finish_postprocess(outer, result, futures)
+
+        for future in futures:
+            future.add_done_callback(on_done)
+
+    def _finish_postprocess(self, outer: Future, result: Dict[str, Any], futures: List[Future]) -> None:
+        """인코딩 결과를 응답에 채우고 후처리 자리를 반납합니다"""
+        try:
+            encoded = [future.result() for future in futures]
+        except BaseException as e:
+            with self._lock:
+                self._post.running -= 1
+                self._post.failed += 1
+            self._post_slots.release()
+            logger.error(f"이미지 후처리 실패: {str(e)}")
+            outer.set_exception(e)
+            return
+
+        result["image_base64"] = encoded[0][0]
+        for draft, (image_base64, _) in zip(result.get("drafts", []), encoded):
+            draft["image_base64"] = image_base64
+
+        with self._lock:
+            self._post.running -= 1
+            self._post.completed += 1
+            self._post.busy_seconds += sum(elapsed for _, elapsed in encoded)
+        self._post_slots.release()
+        outer.set_result(result)
+
+    @property
+    def in_flight(self) -> int:
+        """대기 중이거나 실행 중인 작업 수 (후처리 단계 포함)"""
+        with self._lock:
+            return self._gpu.pending + self._gpu.running + self._post.pending + self._post.running
+
+    def stats(self) -> Dict[str, Any]:
+        """실행기 통계를 반환합니다"""
+        with self._lock:
+            uptime = time.monotonic() - self._started_at
+            gpu = self._gpu.snapshot(uptime)
+            return {
+                "workers": self.max_workers,
+                "queue_limit": self.queue_limit,
+                "pending": gpu["pending"],
+                "running": gpu["running"],
+                "completed": gpu["completed"],
+                "failed": gpu["failed"],
+                "rejected": self._rejected,
+                "busy_seconds": gpu["busy_seconds"],
+                "utilization": gpu["utilization"],
+                "pipelined": self.pipelined,
+                "stages": {
+                    "gpu": gpu,
+                    "postprocess": self._post.snapshot(uptime) if self.pipelined else None
+                }
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """새 작업을 거부하고 실행 중인 작업이 끝날 때까지 기다립니다"""
+        with self._lock:
+            self._shutdown = True
+        logger.info(f"GPU 실행기 종료 중 (남은 작업: {self.in_flight})")
+        self._executor.shutdown(wait=wait)
+        if self._post_pool is not None:
+            self._post_pool.shutdown(wait=wait)
+        logger.info("GPU 실행기 종료 완료")
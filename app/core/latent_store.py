@@ -0,0 +1,103 @@
+"""
+Draft Latent Store
+"""
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+import torch
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+class LatentEntry:
+    """초안 1장의 최종 잠재 텐서와 생성 파라미터"""
+
+    __slots__ = ("draft_id", "latents", "params", "created_at", "nbytes")
+
+    def __init__(self, draft_id: str, latents: torch.Tensor, params: Dict[str, Any]):
+        self.draft_id = draft_id
+        self.latents = latents
+        self.params = params
+        self.created_at = time.time()
+        self.nbytes = latents.element_size() * latents.nelement()
+
+class LatentStore:
+    """초안 잠재 텐서를 CPU 메모리에 보관하는 LRU 저장소 (개수/용량/유효기간 제한)"""
+
+    def __init__(self, config: Config):
+        """
+        Initialize the latent store
+
+        Args:
+            config: Configuration object
+        """
+        self.max_entries = config.LATENT_STORE_MAX_ENTRIES
+        self.max_bytes = config.LATENT_STORE_MAX_MB * 1024 * 1024
+        self.ttl = config.LATENT_STORE_TTL
+        self._entries: "OrderedDict[str, LatentEntry]" = OrderedDict()
+        self._bytes = 0
+        self._evicted = 0
+        self._lock = threading.Lock()
+
+    def put(self, latents: torch.Tensor, params: Dict[str, Any]) -> Optional[str]:
+        """
+        잠재 텐서(배치 차원 1)를 저장하고 초안 ID를 반환합니다
+
+        GPU 메모리를 점유하지 않도록 CPU로 복사해서 보관합니다.
+        텐서 하나가 저장소 용량보다 크면 저장하지 않고 None을 반환합니다.
+        """
+        nbytes = latents.element_size() * latents.nelement()
+        if nbytes > self.max_bytes:
+            logger.warning(f"초안 잠재 텐서가 저장소 용량보다 커서 저장하지 않습니다 ({nbytes} > {self.max_bytes} bytes)")
+            return None
+
+        draft_id = uuid.uuid4().hex[:12]
+        entry = LatentEntry(draft_id, latents.detach().to("cpu", copy=True), dict(params))
+
+        with self._lock:
+            self._entries[draft_id] = entry
+            self._bytes += entry.nbytes
+            self._evict_locked()
+        return draft_id
+
+    def get(self, draft_id: str) -> Optional[LatentEntry]:
+        """초안을 조회합니다 (없거나 만료되었으면 None)"""
+        with self._lock:
+            entry = self._entries.get(draft_id)
+            if entry is None:
+                return None
+            if self.ttl and time.time() - entry.created_at > self.ttl:
+                self._remove_locked(draft_id)
+                return None
+            self._entries.move_to_end(draft_id)
+            return entry
+
+    def _remove_locked(self, draft_id: str) -> None:
+        entry = self._entries.pop(draft_id)
+        self._bytes -= entry.nbytes
+        self._evicted += 1
+
+    def _evict_locked(self) -> None:
+        """만료된 항목과 한도를 넘는 가장 오래 사용되지 않은 항목을 제거합니다"""
+        if self.ttl:
+            now = time.time()
+            expired = [key for key, entry in self._entries.items() if now - entry.created_at > self.ttl]
+            for key in expired:
+                self._remove_locked(key)
+
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            self._remove_locked(next(iter(self._entries)))
+
+    def stats(self) -> Dict[str, Any]:
+        """저장소 통계를 반환합니다"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "evicted": self._evicted
+            }
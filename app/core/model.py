@@ -3,13 +3,18 @@ Qwen Image Generation Model Handler
 """
 import torch
 import logging
-from diffusers import AutoPipelineForText2Image
+from diffusers import AutoPipelineForImage2Image, AutoPipelineForText2Image
 from PIL import Image
 import base64
 import io
 import os
-from typing import Optional, Dict, Any
+import uuid
+from contextlib import nullcontext
+from typing import Optional, Dict, Any, Callable, List, Union
 from .config import Config
+from .feature_cache import FeatureCache, resolve_acceleration
+from .latent_store import LatentStore
+from .profiler import RequestProfiler
 
 logger = logging.getLogger(__name__)
 
@@ -27,6 +32,9 @@ class QwenImageGenerator:
         self.model_name = config.MODEL_NAME
         self.fallback_model = config.FALLBACK_MODEL
         self.pipeline = None
+        self.img2img_pipeline = None
+        self.latent_store = LatentStore(config)
+        self.profiler = RequestProfiler(config)
         self.device = "cuda" if torch.cuda.is_available() and config.USE_CUDA else "cpu"
         
         # Set torch dtype based on config and device
@@ -85,7 +93,12 @@ class QwenImageGenerator:
         height: Optional[int] = None,
         num_inference_steps: Optional[int] = None,
         guidance_scale: Optional[float] = None,
-        seed: Optional[int] = None
+        seed: Optional[int] = None,
+        acceleration: Optional[Union[str, Dict[str, Any]]] = None,
+        save_image: bool = False,
+        draft: bool = False,
+        num_drafts: int = 1,
+        postprocess: Optional[Callable[[Dict[str, Any], List[Image.Image]], None]] = None
     ) -> Dict[str, Any]:
         """
         텍스트 프롬프트로부터 이미지를 생성합니다
@@ -98,6 +111,12 @@ class QwenImageGenerator:
             num_inference_steps: 추론 단계 수
             guidance_scale: 가이던스 스케일
             seed: 랜덤 시드
+            acceleration: 특징 재사용 가속 프리셋 이름 또는 설정 (None이면 기본 프리셋)
+            save_image: 생성된 이미지를 OUTPUT_DIR에 저장할지 여부
+            draft: 적은 단계/낮은 해상도의 초안을 만들고 잠재 텐서를 저장할지 여부
+            num_drafts: 한 번에 생성할 초안 수 (draft=True일 때만 사용)
+            postprocess: 생성된 PIL 이미지를 넘겨받을 후처리 단계 콜백 (GPUExecutor가 전달,
+                None이면 이 스레드에서 PNG 인코딩과 저장까지 수행)
             
         Returns:
             생성된 이미지 정보가 담긴 딕셔너리
@@ -105,74 +124,314 @@ class QwenImageGenerator:
         if self.pipeline is None:
             raise RuntimeError("모델이 로드되지 않았습니다. load_model()을 먼저 호출하세요.")
         
-        # Use config defaults if not provided
-        width = width or self.config.DEFAULT_WIDTH
-        height = height or self.config.DEFAULT_HEIGHT
-        num_inference_steps = num_inference_steps or self.config.DEFAULT_STEPS
+        # Use config defaults if not provided (drafts default to cheap settings)
+        if draft:
+            width = width or self.config.DRAFT_WIDTH
+            height = height or self.config.DRAFT_HEIGHT
+            num_inference_steps = num_inference_steps or self.config.DRAFT_STEPS
+        else:
+            width = width or self.config.DEFAULT_WIDTH
+            height = height or self.config.DEFAULT_HEIGHT
+            num_inference_steps = num_inference_steps or self.config.DEFAULT_STEPS
         guidance_scale = guidance_scale or self.config.DEFAULT_GUIDANCE
         
-        try:
-            logger.info(f"이미지 생성 시작: {prompt[:50]}...")
-            
-            # Set random seed if provided
-            if seed is not None:
-                torch.manual_seed(seed)
-                if torch.cuda.is_available():
-                    torch.cuda.manual_seed(seed)
+        # Profiles this run only when /debug/profile selected it
+        with self.profiler.session(self.pipeline):
+            try:
+                logger.info(f"이미지 생성 시작{' (초안)' if draft else ''}: {prompt[:50]}...")
+                
+                # Set random seed if provided
+                if seed is not None:
+                    torch.manual_seed(seed)
+                    if torch.cuda.is_available():
+                        torch.cuda.manual_seed(seed)
+                
+                # Optional feature reuse across denoising steps
+                feature_cache = self._build_feature_cache(acceleration)
+                
+                # Generate image (drafts stop at the latents and decode them here)
+                with feature_cache.attach() if feature_cache is not None else nullcontext(), \
+                        self.profiler.stage("pipeline"):
+                    result = self.pipeline(
+                        prompt=prompt,
+                        negative_prompt=negative_prompt,
+                        width=width,
+                        height=height,
+                        num_inference_steps=num_inference_steps,
+                        guidance_scale=guidance_scale,
+                        num_images_per_prompt=num_drafts if draft else 1,
+                        output_type="latent" if draft else "pil",
+                        generator=torch.Generator(device=self.device).manual_seed(seed) if seed else None
+                    )
+                
+                response = {
+                    "success": True,
+                    "prompt": prompt,
+                    "negative_prompt": negative_prompt,
+                    "width": width,
+                    "height": height,
+                    "num_inference_steps": num_inference_steps,
+                    "guidance_scale": guidance_scale,
+                    "seed": seed,
+                    "acceleration": feature_cache.stats() if feature_cache is not None else None
+                }
+                
+                if draft:
+                    params = {key: response[key] for key in (
+                        "prompt", "negative_prompt", "width", "height", "guidance_scale", "seed"
+                    )}
+                    images = []
+                    drafts = []
+                    for latents in result.images.split(1):
+                        drafts.append({"draft_id": self.latent_store.put(latents, params)})
+                        images.append(self._decode_latents(latents))
+                    response["drafts"] = drafts
+                    response["draft_id"] = drafts[0]["draft_id"]
+                else:
+                    images = [result.images[0]]
+                
+                logger.info("이미지 생성 완료")
+                
+                return self._finalize(response, images, save_image, postprocess)
+                
+            except Exception as e:
+                logger.error(f"이미지 생성 실패: {str(e)}")
+                return {
+                    "success": False,
+                    "error": str(e),
+                    "prompt": prompt
+                }
+    
+    def refine_image(
+        self,
+        draft_id: str,
+        prompt: Optional[str] = None,
+        negative_prompt: Optional[str] = None,
+        scale: Optional[float] = None,
+        strength: Optional[float] = None,
+        num_inference_steps: Optional[int] = None,
+        guidance_scale: Optional[float] = None,
+        seed: Optional[int] = None,
+        acceleration: Optional[Union[str, Dict[str, Any]]] = None,
+        save_image: bool = False,
+        postprocess: Optional[Callable[[Dict[str, Any], List[Image.Image]], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        저장된 초안의 잠재 텐서를 업스케일하고 이어서 디노이징합니다 (hires-fix 방식)
+        
+        Args:
+            draft_id: generate_image(draft=True)가 반환한 초안 ID
+            prompt: 프롬프트 (None이면 초안의 프롬프트)
+            negative_prompt: 네거티브 프롬프트 (None이면 초안의 값)
+            scale: 잠재 텐서 업스케일 배율
+            strength: 다시 디노이징할 비율 (0-1, 클수록 초안에서 많이 벗어남)
+            num_inference_steps: 추론 단계 수 (strength 비율만큼만 실행됨)
+            guidance_scale: 가이던스 스케일 (None이면 초안의 값)
+            seed: 랜덤 시드 (None이면 초안의 값)
+            acceleration: 특징 재사용 가속 프리셋 이름 또는 설정
+            save_image: 생성된 이미지를 OUTPUT_DIR에 저장할지 여부
+            postprocess: 생성된 PIL 이미지를 넘겨받을 후처리 단계 콜백 (None이면 이 스레드에서 처리)
             
-            # Generate image
-            result = self.pipeline(
-                prompt=prompt,
-                negative_prompt=negative_prompt,
-                width=width,
-                height=height,
-                num_inference_steps=num_inference_steps,
-                guidance_scale=guidance_scale,
-                generator=torch.Generator(device=self.device).manual_seed(seed) if seed else None
+        Returns:
+            생성된 이미지 정보가 담긴 딕셔너리
+        
+        Raises:
+            KeyError: 초안이 없거나 만료된 경우
+            ValueError: 개선 결과 크기가 최대 크기를 넘는 경우
+        """
+        if self.pipeline is None:
+            raise RuntimeError("모델이 로드되지 않았습니다. load_model()을 먼저 호출하세요.")
+        
+        entry = self.latent_store.get(draft_id)
+        if entry is None:
+            raise KeyError(draft_id)
+        
+        params = entry.params
+        prompt = prompt or params["prompt"]
+        negative_prompt = negative_prompt if negative_prompt is not None else params["negative_prompt"]
+        scale = scale or self.config.REFINE_SCALE
+        strength = strength or self.config.REFINE_STRENGTH
+        num_inference_steps = num_inference_steps or self.config.DEFAULT_STEPS
+        guidance_scale = guidance_scale or params["guidance_scale"]
+        seed = seed if seed is not None else params["seed"]
+        
+        # Final size follows the upscaled latent grid
+        latent_height, latent_width = entry.latents.shape[-2:]
+        width = int(latent_width * scale) * self.vae_scale_factor
+        height = int(latent_height * scale) * self.vae_scale_factor
+        if width > self.config.MAX_WIDTH or height > self.config.MAX_HEIGHT:
+            raise ValueError(
+                f"개선 결과 크기 {width}x{height}가 최대 크기 "
+                f"{self.config.MAX_WIDTH}x{self.config.MAX_HEIGHT}를 넘습니다"
             )
+        
+        with self.profiler.session(self.pipeline, label="refine"):
+            try:
+                logger.info(f"초안 개선 시작: {draft_id} (x{scale}, strength={strength})")
+                
+                img2img = self._get_img2img_pipeline()
+                device = getattr(self.pipeline, "_execution_device", self.device)
+                
+                # Upscale in latent space, then continue denoising from there
+                with self.profiler.stage("latent_upscale"):
+                    latents = entry.latents.to(device=device, dtype=self.torch_dtype)
+                    latents = torch.nn.functional.interpolate(
+                        latents,
+                        size=(height // self.vae_scale_factor, width // self.vae_scale_factor),
+                        mode="bicubic",
+                        align_corners=False
+                    )
+                
+                feature_cache = self._build_feature_cache(acceleration)
+                with feature_cache.attach() if feature_cache is not None else nullcontext(), \
+                        self.profiler.stage("pipeline"):
+                    result = img2img(
+                        prompt=prompt,
+                        negative_prompt=negative_prompt,
+                        image=latents,
+                        strength=strength,
+                        num_inference_steps=num_inference_steps,
+                        guidance_scale=guidance_scale,
+                        generator=torch.Generator(device=self.device).manual_seed(seed) if seed else None
+                    )
+                
+                response = {
+                    "success": True,
+                    "prompt": prompt,
+                    "negative_prompt": negative_prompt,
+                    "width": width,
+                    "height": height,
+                    "num_inference_steps": num_inference_steps,
+                    "guidance_scale": guidance_scale,
+                    "seed": seed,
+                    "acceleration": feature_cache.stats() if feature_cache is not None else None,
+                    "refined_from": draft_id,
+                    "strength": strength
+                }
+                
+                logger.info("초안 개선 완료")
+                
+                return self._finalize(response, [result.images[0]], save_image, postprocess)
+                
+            except Exception as e:
+                logger.error(f"초안 개선 실패: {str(e)}")
+                return {
+                    "success": False,
+                    "error": str(e),
+                    "prompt": prompt
+                }
+    
+    @property
+    def vae_scale_factor(self) -> int:
+        """픽셀 공간과 잠재 공간의 크기 비율"""
+        return getattr(self.pipeline, "vae_scale_factor", 8)
+    
+    def _get_img2img_pipeline(self):
+        """텍스트-이미지 파이프라인과 구성 요소를 공유하는 img2img 파이프라인을 반환합니다"""
+        if self.img2img_pipeline is None:
+            self.img2img_pipeline = AutoPipelineForImage2Image.from_pipe(self.pipeline)
+        return self.img2img_pipeline
+    
+    def _decode_latents(self, latents: torch.Tensor) -> Image.Image:
+        """파이프라인이 반환한 잠재 텐서를 VAE로 디코딩합니다"""
+        vae = self.pipeline.vae
+        
+        with torch.no_grad():
+            # SDXL's fp16 VAE overflows, decode it in float32 like the pipeline does
+            needs_upcasting = vae.dtype == torch.float16 and getattr(vae.config, "force_upcast", False)
+            if needs_upcasting:
+                vae.to(dtype=torch.float32)
             
-            image = result.images[0]
-            
-            # Convert image to base64
-            buffered = io.BytesIO()
-            image.save(buffered, format="PNG")
-            img_base64 = base64.b64encode(buffered.getvalue()).decode()
+            device = getattr(self.pipeline, "_execution_device", self.device)
+            latents = latents.to(device=device, dtype=vae.dtype)
             
-            logger.info("이미지 생성 완료")
+            latents_mean = getattr(vae.config, "latents_mean", None)
+            latents_std = getattr(vae.config, "latents_std", None)
+            if latents_mean is not None and latents_std is not None:
+                mean = torch.tensor(latents_mean).view(1, -1, 1, 1).to(latents)
+                std = torch.tensor(latents_std).view(1, -1, 1, 1).to(latents)
+                latents = latents * std / vae.config.scaling_factor + mean
+            else:
+                latents = latents / vae.config.scaling_factor
             
-            return {
-                "success": True,
-                "image_base64": img_base64,
-                "prompt": prompt,
-                "negative_prompt": negative_prompt,
-                "width": width,
-                "height": height,
-                "num_inference_steps": num_inference_steps,
-                "guidance_scale": guidance_scale,
-                "seed": seed
-            }
+            image = vae.decode(latents, return_dict=False)[0]
             
-        except Exception as e:
-            logger.error(f"이미지 생성 실패: {str(e)}")
-            return {
-                "success": False,
-                "error": str(e),
-                "prompt": prompt
-            }
+            if needs_upcasting:
+                vae.to(dtype=torch.float16)
+        
+        return self.pipeline.image_processor.postprocess(image, output_type="pil")[0]
+    
+    def _encode_image(self, image: Image.Image) -> str:
+        """PIL 이미지를 PNG base64 문자열로 변환합니다"""
+        with self.profiler.stage("image_encode"):
+            buffered = io.BytesIO()
+            image.save(buffered, format="PNG")
+            return base64.b64encode(buffered.getvalue()).decode()
+    
+    def _finalize(
+        self,
+        response: Dict[str, Any],
+        images: List[Image.Image],
+        save_image: bool,
+        postprocess: Optional[Callable[[Dict[str, Any], List[Image.Image]], None]]
+    ) -> Dict[str, Any]:
+        """
+        생성된 이미지를 응답에 담습니다
+        
+        postprocess가 있으면 PIL 이미지를 후처리 단계에 넘기고(GPUExecutor가
+        인코딩/저장 후 응답을 채움), 없으면 이 스레드에서 PNG base64 인코딩과
+        저장을 수행합니다.
+        """
+        if postprocess is not None:
+            # Hand-off (and any back-pressure wait) is recorded in the request's trace;
+            # the encoding itself runs in worker processes after the trace is saved
+            with self.profiler.stage("postprocess_handoff"):
+                postprocess(response, images)
+            return response
+        
+        encoded = [self._encode_image(image) for image in images]
+        response["image_base64"] = encoded[0]
+        for draft, image_base64 in zip(response.get("drafts", []), encoded):
+            draft["image_base64"] = image_base64
+        
+        # Save image option
+        if save_image:
+            filename = f"generated_{uuid.uuid4().hex[:8]}.png"
+            response["saved_path"] = self.save_image(response["image_base64"], filename)
+            response["filename"] = filename
+        
+        return response
+    
+    def _build_feature_cache(
+        self,
+        acceleration: Optional[Union[str, Dict[str, Any]]]
+    ) -> Optional[FeatureCache]:
+        """요청된 가속 설정에 맞는 특징 캐시를 생성합니다"""
+        settings = resolve_acceleration(acceleration, self.config)
+        if settings is None:
+            return None
+        
+        denoiser = getattr(self.pipeline, "unet", None)
+        if not FeatureCache.supports(denoiser):
+            logger.warning("현재 모델은 특징 재사용 가속을 지원하지 않아 전체 계산으로 진행합니다")
+            return None
+        
+        return FeatureCache(denoiser, **settings)
     
     def save_image(self, image_base64: str, filename: str) -> str:
         """Base64 인코딩된 이미지를 파일로 저장합니다"""
         try:
-            # Decode base64 image
-            image_data = base64.b64decode(image_base64)
-            image = Image.open(io.BytesIO(image_data))
-            
-            # Ensure output directory exists
-            os.makedirs(self.config.OUTPUT_DIR, exist_ok=True)
-            filepath = os.path.join(self.config.OUTPUT_DIR, filename)
-            
-            # Save image
-            image.save(filepath)
+            with self.profiler.stage("image_save"):
+                # Decode base64 image
+                image_data = base64.b64decode(image_base64)
+                image = Image.open(io.BytesIO(image_data))
+                
+                # Ensure output directory exists
+                os.makedirs(self.config.OUTPUT_DIR, exist_ok=True)
+                filepath = os.path.join(self.config.OUTPUT_DIR, filename)
+                
+                # Save image
+                image.save(filepath)
             logger.info(f"이미지 저장됨: {filepath}")
             
             return filepath
@@ -191,10 +450,16 @@ class QwenImageGenerator:
             "is_loaded": self.pipeline is not None,
             "cuda_available": torch.cuda.is_available(),
             "cuda_memory": torch.cuda.get_device_properties(0).total_memory if torch.cuda.is_available() else None,
+            "latent_store": self.latent_store.stats(),
             "config": {
                 "default_width": self.config.DEFAULT_WIDTH,
                 "default_height": self.config.DEFAULT_HEIGHT,
                 "default_steps": self.config.DEFAULT_STEPS,
-                "default_guidance": self.config.DEFAULT_GUIDANCE
+                "default_guidance": self.config.DEFAULT_GUIDANCE,
+                "draft_width": self.config.DRAFT_WIDTH,
+                "draft_height": self.config.DRAFT_HEIGHT,
+                "draft_steps": self.config.DRAFT_STEPS,
+                "default_acceleration": self.config.DEFAULT_ACCELERATION,
+                "acceleration_presets": list(self.config.FEATURE_CACHE_PRESETS)
             }
         }
@@ -0,0 +1,41 @@
+"""
+Image Post-processing (runs in worker processes)
+
+GPU 스레드가 다음 배치의 디노이징을 바로 시작할 수 있도록 PNG 인코딩,
+base64 변환, 파일 저장을 별도 프로세스에서 실행합니다.
+워커는 spawn 방식으로 시작되므로 이 모듈은 torch/diffusers를 import하지 않습니다.
+"""
+import base64
+import io
+import os
+import time
+from typing import Optional, Tuple
+from PIL import Image
+
+def encode_png(mode: str, size: Tuple[int, int], data: bytes, save_path: Optional[str] = None) -> Tuple[str, float]:
+    """
+    원시 픽셀 데이터를 PNG로 인코딩하고 필요하면 파일로 저장합니다
+
+    Args:
+        mode: PIL 이미지 모드 (예: 'RGB')
+        size: (너비, 높이)
+        data: Image.tobytes() 결과
+        save_path: 저장할 파일 경로 (None이면 저장하지 않음)
+
+    Returns:
+        (base64 문자열, 소요 시간(초))
+    """
+    start = time.perf_counter()
+
+    image = Image.frombytes(mode, size, data)
+    buffered = io.BytesIO()
+    image.save(buffered, format="PNG")
+    png = buffered.getvalue()
+
+    # Write the already-encoded PNG instead of re-encoding it
+    if save_path:
+        os.makedirs(os.path.dirname(save_path) or ".", exist_ok=True)
+        with open(save_path, "wb") as f:
+            f.write(png)
+
+    return base64.b64encode(png).decode(), time.perf_counter() - start
@@ -0,0 +1,369 @@
+"""
+On-demand Request Profiler
+
+관리자가 활성화하면 다음 N개 요청(또는 일정 비율의 요청)을 torch 프로파일러와
+Python 스택 샘플링으로 기록하여 Chrome trace / Perfetto JSON 파일로 저장합니다.
+비활성화 상태에서는 플래그 확인 외에 아무 작업도 하지 않습니다.
+"""
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from contextlib import nullcontext
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import torch
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+_NULL_CONTEXT = nullcontext()
+
+TRACE_ID_PATTERN = re.compile(r'^[0-9]{8}-[0-9]{6}-[0-9a-f]{8}$')
+
+# Synthetic thread id for the Python stack sample track in the merged trace
+SAMPLER_TID = 999999
+
+class StackSampler(threading.Thread):
+    """대상 스레드의 Python 스택을 주기적으로 샘플링하여 trace 이벤트로 만드는 스레드"""
+
+    def __init__(self, target_thread_id: int, interval: float):
+        super().__init__(name='profile-sampler', daemon=True)
+        self.target_thread_id = target_thread_id
+        self.interval = interval
+        self.start_time = time.perf_counter()
+        self.events: List[Dict[str, Any]] = []
+        self._stop_event = threading.Event()
+        self._open: List[Any] = []
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.target_thread_id)
+            if frame is None:
+                continue
+            self._record(self._stack(frame), time.perf_counter())
+
+    @staticmethod
+    def _stack(frame) -> List[str]:
+        """루트에서 리프 순서의 프레임 이름 목록을 만듭니다"""
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+            frame = frame.f_back
+        stack.reverse()
+        return stack
+
+    def _record(self, stack: List[str], now: float) -> None:
+        """이전 샘플과 달라진 프레임을 닫고 새 프레임을 엽니다"""
+        common = 0
+        while (common < len(self._open) and common < len(stack)
+               and self._open[common][0] == stack[common]):
+            common += 1
+        self._close(common, now)
+        for name in stack[common:]:
+            self._open.append((name, now))
+
+    def _close(self, depth: int, now: float) -> None:
+        """depth 이후의 열린 프레임을 완료 이벤트로 기록합니다"""
+        while len(self._open) > depth:
+            name, started = self._open.pop()
+            self.events.append({
+                "name": name,
+                "ph": "X",
+                "cat": "python_sample",
+                "ts": (started - self.start_time) * 1e6,
+                "dur": (now - started) * 1e6,
+            })
+
+    def stop(self) -> List[Dict[str, Any]]:
+        """샘플링을 멈추고 start_time 기준 상대 시각(µs)의 이벤트를 반환합니다"""
+        self._stop_event.set()
+        self.join()
+        self._close(0, time.perf_counter())
+        return self.events
+
+class ProfileSession:
+    """요청 1건의 프로파일링 세션"""
+
+    def __init__(self, profiler: 'RequestProfiler', pipeline: Any, label: str):
+        self.profiler = profiler
+        self.pipeline = pipeline
+        self.label = label
+        self.trace_id = f"{datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}"
+        self._torch_profiler = None
+        self._sampler: Optional[StackSampler] = None
+        self._hooks: List[Any] = []
+        self._patched: List[Any] = []
+        self._ranges: List[Any] = []
+        self._step = 0
+        self._owner: Optional[int] = None
+
+    def __enter__(self):
+        activities = [torch.profiler.ProfilerActivity.CPU]
+        if torch.cuda.is_available():
+            activities.append(torch.profiler.ProfilerActivity.CUDA)
+        self._torch_profiler = torch.profiler.profile(activities=activities)
+        self._torch_profiler.__enter__()
+
+        # Zero-length anchor used to align the Python samples with torch's clock
+        with torch.profiler.record_function("profile_anchor"):
+            anchor = time.perf_counter()
+        self._owner = threading.get_ident()
+        if self.profiler.stack_sampling:
+            self._sampler = StackSampler(self._owner, self.profiler.sample_interval)
+            self._sampler.start_time = anchor
+            self._sampler.start()
+
+        self._install_hooks()
+        self.profiler._local.session = self
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.profiler._local.session = None
+        self._remove_hooks()
+        self._owner = None
+        samples = self._sampler.stop() if self._sampler is not None else []
+        self._torch_profiler.__exit__(exc_type, exc, tb)
+        try:
+            self.profiler._save(self, samples)
+        except Exception as e:
+            logger.error(f"프로파일 저장 실패: {str(e)}")
+        finally:
+            self.profiler._release()
+        return False
+
+    def _install_hooks(self) -> None:
+        """파이프라인 구성 요소에 단계별 trace 구간을 설치합니다"""
+        if self.pipeline is None:
+            return
+
+        for name in ("text_encoder", "text_encoder_2", "text_encoder_3"):
+            module = getattr(self.pipeline, name, None)
+            if isinstance(module, torch.nn.Module):
+                self._hook_module(module, lambda: "text_encode")
+
+        denoiser = getattr(self.pipeline, "unet", None) or getattr(self.pipeline, "transformer", None)
+        if isinstance(denoiser, torch.nn.Module):
+            self._hook_module(denoiser, self._next_step_name)
+
+        vae = getattr(self.pipeline, "vae", None)
+        if vae is not None and hasattr(vae, "decode"):
+            self._patch_method(vae, "decode", "vae_decode")
+
+    def _next_step_name(self) -> str:
+        name = f"denoise_step_{self._step}"
+        self._step += 1
+        return name
+
+    def _hook_module(self, module: torch.nn.Module, name_fn) -> None:
+        """모듈 forward 구간을 record_function으로 감쌉니다"""
+        # Hooks live on the shared module; forwards from other threads (warmup, other requests) are not ours
+        def pre_hook(_module, _args):
+            if threading.get_ident() != self._owner:
+                return
+            record = torch.profiler.record_function(name_fn())
+            record.__enter__()
+            self._ranges.append(record)
+
+        def post_hook(_module, _args, _output):
+            if threading.get_ident() != self._owner:
+                return
+            if self._ranges:
+                self._ranges.pop().__exit__(None, None, None)
+
+        self._hooks.append(module.register_forward_pre_hook(pre_hook))
+        self._hooks.append(module.register_forward_hook(post_hook))
+
+    def _patch_method(self, obj: Any, method_name: str, range_name: str) -> None:
+        """forward가 아닌 메서드(vae.decode 등)를 record_function으로 감쌉니다"""
+        had_instance_attr = method_name in obj.__dict__
+        original = getattr(obj, method_name)
+
+        def wrapper(*args, **kwargs):
+            if threading.get_ident() != self._owner:
+                return original(*args, **kwargs)
+            with torch.profiler.record_function(range_name):
+                return original(*args, **kwargs)
+
+        setattr(obj, method_name, wrapper)
+        self._patched.append((obj, method_name, had_instance_attr, original))
+
+    def _remove_hooks(self) -> None:
+        """설치한 훅과 패치를 되돌립니다"""
+        while self._ranges:
+            self._ranges.pop().__exit__(None, None, None)
+        for hook in self._hooks:
+            hook.remove()
+        self._hooks.clear()
+        for obj, method_name, had_instance_attr, original in reversed(self._patched):
+            if had_instance_attr:
+                setattr(obj, method_name, original)
+            else:
+                delattr(obj, method_name)
+        self._patched.clear()
+
+class RequestProfiler:
+    """요청 단위 프로파일링을 관리하는 클래스"""
+
+    def __init__(self, config: Config):
+        """
+        Initialize the request profiler
+
+        Args:
+            config: Configuration object
+        """
+        self.output_dir = config.PROFILE_DIR
+        self.max_traces = config.PROFILE_MAX_TRACES
+        self.sample_interval = config.PROFILE_SAMPLE_INTERVAL_MS / 1000.0
+        self.stack_sampling = True
+        self.enabled = False
+        self._remaining: Optional[int] = 0
+        self._sample_rate = 0.0
+        self._busy = False
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def arm(self, count: Optional[int] = None, sample_rate: Optional[float] = None,
+            stack_sampling: bool = True) -> Dict[str, Any]:
+        """
+        다음 count개 요청 또는 sample_rate 비율의 요청을 프로파일링하도록 설정합니다
+
+        sample_rate와 count를 함께 주면 count개를 기록할 때까지 비율에 따라 선택하고,
+        sample_rate만 주면 disarm()할 때까지 계속 선택합니다.
+        """
+        with self._lock:
+            if count is None:
+                count = None if sample_rate else 1
+            self._remaining = count
+            self._sample_rate = sample_rate or 0.0
+            self.stack_sampling = stack_sampling
+            self.enabled = count is None or count > 0
+        logger.info(f"프로파일링 활성화: count={count}, sample_rate={sample_rate}")
+        return self.status()
+
+    def disarm(self) -> Dict[str, Any]:
+        """프로파일링을 비활성화합니다"""
+        with self._lock:
+            self._remaining = 0
+            self._sample_rate = 0.0
+            self.enabled = False
+        logger.info("프로파일링 비활성화")
+        return self.status()
+
+    def session(self, pipeline: Any, label: str = "generate"):
+        """
+        이번 요청을 프로파일링할 세션을 반환합니다
+
+        비활성화 상태이거나 선택되지 않은 요청이면 아무 일도 하지 않는 컨텍스트를 반환합니다.
+        """
+        if not self.enabled:
+            return _NULL_CONTEXT
+        if not self._select():
+            return _NULL_CONTEXT
+        return ProfileSession(self, pipeline, label)
+
+    def stage(self, name: str):
+        """활성 세션이 있으면 이름 붙은 trace 구간을, 없으면 빈 컨텍스트를 반환합니다"""
+        if getattr(self._local, "session", None) is None:
+            return _NULL_CONTEXT
+        return torch.profiler.record_function(name)
+
+    def _select(self) -> bool:
+        """이번 요청을 프로파일링할지 결정합니다 (동시에 한 세션만 허용)"""
+        with self._lock:
+            if self._busy or not self.enabled:
+                return False
+            if self._sample_rate > 0 and random.random() >= self._sample_rate:
+                return False
+            if self._remaining is not None:
+                self._remaining -= 1
+                if self._remaining <= 0:
+                    self.enabled = False
+            self._busy = True
+            return True
+
+    def _release(self) -> None:
+        with self._lock:
+            self._busy = False
+
+    def _save(self, session: ProfileSession, samples: List[Dict[str, Any]]) -> str:
+        """torch trace와 Python 샘플을 합쳐 파일로 저장하고 오래된 trace를 정리합니다"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, f"{session.trace_id}.json")
+        tmp_path = f"{path}.tmp"
+
+        session._torch_profiler.export_chrome_trace(tmp_path)
+        with open(tmp_path, encoding="utf-8") as f:
+            trace = json.load(f)
+        events = trace if isinstance(trace, list) else trace.setdefault("traceEvents", [])
+
+        if samples:
+            anchor = next((e for e in events if e.get("name") == "profile_anchor"), None)
+            base_ts = float(anchor["ts"]) if anchor is not None else 0.0
+            pid = anchor.get("pid", os.getpid()) if anchor is not None else os.getpid()
+            events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": SAMPLER_TID,
+                           "args": {"name": "Python stack samples"}})
+            for event in samples:
+                event.update({"pid": pid, "tid": SAMPLER_TID, "ts": base_ts + event["ts"]})
+                events.append(event)
+
+        if isinstance(trace, dict):
+            trace.setdefault("metadata", {})["label"] = session.label
+
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(trace, f)
+        os.replace(tmp_path, path)
+        logger.info(f"프로파일 저장됨: {path}")
+
+        self._evict()
+        return path
+
+    def _evict(self) -> None:
+        """최근 max_traces개만 남기고 오래된 trace를 삭제합니다"""
+        traces = self.list_traces()
+        for entry in traces[self.max_traces:]:
+            try:
+                os.remove(os.path.join(self.output_dir, f"{entry['trace_id']}.json"))
+            except OSError as e:
+                logger.warning(f"오래된 프로파일 삭제 실패: {str(e)}")
+
+    def list_traces(self) -> List[Dict[str, Any]]:
+        """저장된 trace 목록을 최신순으로 반환합니다"""
+        if not os.path.isdir(self.output_dir):
+            return []
+        traces = []
+        for filename in os.listdir(self.output_dir):
+            trace_id, ext = os.path.splitext(filename)
+            if ext != ".json" or not TRACE_ID_PATTERN.match(trace_id):
+                continue
+            stat = os.stat(os.path.join(self.output_dir, filename))
+            traces.append({
+                "trace_id": trace_id,
+                "size": stat.st_size,
+                "created_at": datetime.fromtimestamp(stat.st_mtime).isoformat()
+            })
+        traces.sort(key=lambda entry: entry["trace_id"], reverse=True)
+        return traces
+
+    def trace_path(self, trace_id: str) -> Optional[str]:
+        """trace 파일 경로를 반환합니다 (존재하지 않거나 ID가 잘못되면 None)"""
+        if not TRACE_ID_PATTERN.match(trace_id):
+            return None
+        path = os.path.join(self.output_dir, f"{trace_id}.json")
+        return path if os.path.exists(path) else None
+
+    def status(self) -> Dict[str, Any]:
+        """프로파일러 상태를 반환합니다"""
+        return {
+            "enabled": self.enabled,
+            "remaining": self._remaining,
+            "sample_rate": self._sample_rate,
+            "stack_sampling": self.stack_sampling,
+            "traces": self.list_traces()
+        }
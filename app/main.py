@@ -1,12 +1,13 @@
 """
 Main Flask Application Entry Point
+
+후처리 프로세스 풀(spawn)은 이 모듈을 워커마다 다시 import하므로,
+모듈 수준에서는 torch/diffusers를 불러오는 모듈을 import하지 않습니다.
 """
-from flask import Flask
 import logging
 import threading
 import os
 from .core.config import config, Config
-from .api.routes import api_bp, init_model
 
 def create_app(config_name='default'):
     """
@@ -18,6 +19,10 @@ def create_app(config_name='default'):
     Returns:
         Flask 애플리케이션 인스턴스
     """
+    # Imported here so spawned post-processing workers don't load the model stack
+    from flask import Flask
+    from .api.routes import api_bp, init_model
+    
     app = Flask(__name__)
     
     # Load configuration
@@ -60,12 +65,18 @@ def main():
     # Get configuration from environment
     config_name = os.environ.get('FLASK_ENV', 'default')
     
-    # Create Flask app
-    app = create_app(config_name)
-    
     # Get config
     app_config = config[config_name]
     
+    # Async serving mode (ASGI, GPU work on a dedicated executor)
+    if app_config.SERVER_MODE == 'async':
+        from .asgi import run_async
+        run_async(config_name)
+        return
+    
+    # Create Flask app
+    app = create_app(config_name)
+    
     # Run the application
     logger = logging.getLogger(__name__)
     logger.info(f"Flask 서버 시작...")
@@ -0,0 +1,22 @@
+# Qwen Image Generator Client Package
+from .base import ClientError, RetryExhaustedError
+from .sync_client import QwenImageClient
+
+__all__ = [
+    "AsyncQwenImageClient",
+    "BulkManifest",
+    "ClientError",
+    "QwenImageClient",
+    "RetryExhaustedError",
+    "load_jobs",
+    "validate_job",
+]
+
+# The asyncio client needs aiohttp; import it only when used so sync-only users don't need it
+_ASYNC_EXPORTS = ("AsyncQwenImageClient", "BulkManifest", "load_jobs", "validate_job")
+
+def __getattr__(name):
+    if name in _ASYNC_EXPORTS:
+        from . import async_client
+        return getattr(async_client, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,361 @@
+"""
+Asyncio Qwen Image Generator client with bounded-concurrency bulk submission
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set
+import aiohttp
+from .base import (
+    CHUNK_SIZE,
+    DEFAULT_BACKOFF,
+    DEFAULT_MAX_BACKOFF,
+    DEFAULT_MAX_RETRIES,
+    DEFAULT_TIMEOUT,
+    REJECTED_STATUSES,
+    RETRY_STATUSES,
+    ClientError,
+    RetryExhaustedError,
+    build_payload,
+    error_message,
+    image_metadata,
+    job_id,
+    retry_delay,
+)
+
+logger = logging.getLogger(__name__)
+
+class AsyncQwenImageClient:
+    """연결 풀과 재시도를 지원하는 asyncio API 클라이언트"""
+
+    def __init__(
+        self,
+        base_url: str = "http://localhost:5000",
+        timeout: float = DEFAULT_TIMEOUT,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        backoff: float = DEFAULT_BACKOFF,
+        max_backoff: float = DEFAULT_MAX_BACKOFF,
+        pool_size: int = 32
+    ):
+        """
+        Initialize the client
+
+        Args:
+            base_url: API 서버 URL
+            timeout: 요청 타임아웃(초)
+            max_retries: 202/429/5xx 및 연결 오류 재시도 횟수
+            backoff: 지수 백오프 기본 대기 시간(초)
+            max_backoff: 최대 대기 시간(초)
+            pool_size: 최대 동시 연결 수
+        """
+        self.base_url = base_url.rstrip("/")
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.pool_size = pool_size
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """이벤트 루프 안에서 처음 사용할 때 세션을 만듭니다"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_size, limit_per_host=self.pool_size)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        return self._session
+
+    async def close(self) -> None:
+        """연결 풀을 닫습니다"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    async def _request(self, method: str, path: str, **kwargs) -> aiohttp.ClientResponse:
+        """
+        재시도 정책을 적용하여 요청을 보냅니다
+
+        반환된 응답은 호출자가 release()해야 합니다. POST는 서버가 작업을
+        시작하지 않은 경우(연결 실패, 202/429/503)에만 재시도합니다.
+
+        Raises:
+            RetryExhaustedError: 재시도 가능한 응답/오류가 한도를 넘은 경우
+            ClientError: 재시도할 수 없는 오류 응답인 경우
+        """
+        url = f"{self.base_url}{path}"
+        attempts = self.max_retries + 1
+        idempotent = method.upper() != "POST"
+        retry_statuses = RETRY_STATUSES if idempotent else REJECTED_STATUSES
+
+        for attempt in range(attempts):
+            try:
+                response = await self.session.request(method, url, **kwargs)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                # Only a failed connect guarantees the server never saw the POST
+                if not idempotent and not isinstance(e, aiohttp.ClientConnectorError):
+                    raise ClientError(f"요청 실패 (서버에서 작업이 계속 진행 중일 수 있음): {e!r}") from e
+                if attempt + 1 >= attempts:
+                    raise RetryExhaustedError(f"연결 실패: {e}") from e
+                delay = retry_delay(attempt, None, self.backoff, self.max_backoff)
+                logger.warning(f"연결 오류, {delay:.1f}초 후 재시도: {e}")
+                await asyncio.sleep(delay)
+                continue
+
+            if response.status in retry_statuses and attempt + 1 < attempts:
+                delay = retry_delay(attempt, response.headers.get("Retry-After"), self.backoff, self.max_backoff)
+                logger.info(f"서버 응답 {response.status}, {delay:.1f}초 후 재시도")
+                response.release()
+                await asyncio.sleep(delay)
+                continue
+
+            if response.status >= 400 or response.status in retry_statuses:
+                text = await response.text()
+                response.release()
+                try:
+                    payload = json.loads(text)
+                except ValueError:
+                    payload = {}
+                payload = payload if isinstance(payload, dict) else {}
+                error_class = RetryExhaustedError if response.status in retry_statuses else ClientError
+                raise error_class(error_message(response.status, payload, text), status=response.status, payload=payload)
+
+            return response
+
+        raise RetryExhaustedError("재시도 횟수를 초과했습니다")
+
+    async def health(self) -> Dict[str, Any]:
+        """헬스체크 결과를 반환합니다 (재시도 없음)"""
+        try:
+            async with self.session.get(f"{self.base_url}/health", timeout=aiohttp.ClientTimeout(total=10)) as response:
+                payload = await response.json(content_type=None)
+                status = response.status
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            raise ClientError(f"헬스체크 연결 실패: {e}") from e
+        payload = payload if isinstance(payload, dict) else {}
+        payload.setdefault("status", "error")
+        payload["http_status"] = status
+        return payload
+
+    async def wait_until_ready(self, timeout: float = 300, interval: float = 5) -> bool:
+        """서비스가 준비될 때까지 기다립니다"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                if (await self.health()).get("status") == "ready":
+                    return True
+            except ClientError as e:
+                logger.info(f"헬스체크 실패: {e}")
+            await asyncio.sleep(interval)
+        return False
+
+    async def generate(self, prompt: str, **params) -> Dict[str, Any]:
+        """이미지를 생성하고 JSON 응답(image_base64 포함)을 반환합니다"""
+        response = await self._request("POST", "/generate", json=build_payload(prompt, **params))
+        async with response:
+            return await response.json()
+
+    async def generate_to_file(self, prompt: str, path: str, **params) -> Dict[str, Any]:
+        """
+        이미지를 생성하고 PNG 바이트를 메모리에 모으지 않고 파일로 스트리밍합니다
+
+        Returns:
+            저장 경로와 응답 헤더의 생성 파라미터
+        """
+        payload = build_payload(prompt, response_format="png", **params)
+        response = await self._request("POST", "/generate", json=payload)
+        async with response:
+            await _stream_to_file(response, path)
+            return image_metadata(path, response.headers)
+
+    async def refine(self, draft_id: str, **params) -> Dict[str, Any]:
+        """초안(generate(..., draft=True)의 draft_id)을 고해상도로 개선합니다"""
+        payload = {"draft_id": draft_id}
+        payload.update({key: value for key, value in params.items() if value is not None})
+        response = await self._request("POST", "/refine", json=payload)
+        async with response:
+            return await response.json()
+
+    async def download_image(self, filename: str, path: str) -> str:
+        """서버에 저장된 이미지를 파일로 스트리밍합니다"""
+        response = await self._request("GET", f"/images/{filename}")
+        async with response:
+            await _stream_to_file(response, path)
+        return path
+
+    async def bulk_generate(
+        self,
+        jobs: Iterable[Dict[str, Any]],
+        output_dir: str,
+        concurrency: int = 4,
+        manifest_path: Optional[str] = None
+    ) -> Dict[str, int]:
+        """
+        많은 프롬프트를 제한된 동시성으로 생성하여 파일로 저장합니다
+
+        완료된 작업은 매니페스트(JSONL)에 기록되므로, 중단된 실행을 같은
+        매니페스트로 다시 실행하면 완료된 작업은 건너뛰고 이어서 진행합니다.
+
+        Args:
+            jobs: {"prompt": ..., 기타 /generate 파라미터} 딕셔너리 목록
+            output_dir: 이미지를 저장할 디렉토리
+            concurrency: 동시에 진행할 최대 요청 수
+            manifest_path: 매니페스트 경로 (기본값: output_dir/manifest.jsonl)
+
+        Returns:
+            완료/건너뜀/실패 작업 수
+        """
+        manifest = BulkManifest(manifest_path or os.path.join(output_dir, "manifest.jsonl"))
+        completed = manifest.completed_ids()
+        semaphore = asyncio.Semaphore(concurrency)
+        counts = {"done": 0, "skipped": 0, "failed": 0}
+
+        occurrences: Dict[str, int] = {}
+
+        async def run_job(job: Dict[str, Any], current_id: str):
+            job = dict(job)
+            prompt = job.pop("prompt")
+
+            if current_id in completed:
+                counts["skipped"] += 1
+                return
+
+            path = os.path.join(output_dir, f"{current_id}.png")
+            async with semaphore:
+                try:
+                    metadata = await self.generate_to_file(prompt, path, **job)
+                except Exception as e:
+                    # Streaming/disk errors fail this job only, not the whole run
+                    counts["failed"] += 1
+                    manifest.record(current_id, prompt, "failed", error=str(e) or repr(e))
+                    logger.error(f"작업 실패 ({current_id}): {e!r}")
+                    return
+
+            counts["done"] += 1
+            manifest.record(current_id, prompt, "done", path=path, seed=metadata["seed"])
+
+        # Only `concurrency` jobs hold a connection at once; the rest wait on the semaphore
+        pending: Set[asyncio.Task] = set()
+        try:
+            for index, job in enumerate(jobs):
+                # A malformed job (no prompt, non-JSON values) fails alone instead of aborting the run
+                try:
+                    payload = validate_job(job)
+                    base_id = job_id(payload)
+                except (TypeError, ValueError) as e:
+                    counts["failed"] += 1
+                    prompt = job.get("prompt") if isinstance(job, dict) else None
+                    manifest.record(f"invalid-{index}", prompt if isinstance(prompt, str) else None,
+                                    "failed", error=str(e))
+                    logger.error(f"잘못된 작업 ({index}번째): {e}")
+                    continue
+
+                # Identical jobs get distinct ids (and files) by their occurrence number
+                occurrence = occurrences.get(base_id, 0)
+                occurrences[base_id] = occurrence + 1
+                current_id = job_id(payload, occurrence)
+
+                pending.add(asyncio.ensure_future(run_job(job, current_id)))
+                if len(pending) >= concurrency * 4:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        task.result()
+            if pending:
+                done, pending = await asyncio.wait(pending)
+                for task in done:
+                    task.result()
+        except BaseException:
+            # Fatal error or cancellation: don't leave orphaned requests running
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            raise
+
+        logger.info(f"일괄 생성 완료: {counts}")
+        return counts
+
+class BulkManifest:
+    """일괄 생성 진행 상황을 JSONL 파일에 기록하는 클래스"""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def completed_ids(self) -> Set[str]:
+        """이미 완료되어 파일이 존재하는 작업 ID 목록을 반환합니다"""
+        completed: Set[str] = set()
+        if not os.path.exists(self.path):
+            return completed
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A truncated last line from an interrupted run
+                    continue
+                if entry.get("status") == "done" and os.path.exists(entry.get("path", "")):
+                    completed.add(entry["id"])
+        return completed
+
+    def record(self, current_id: str, prompt: str, status: str, **fields) -> None:
+        """작업 결과를 한 줄 추가합니다"""
+        entry = {"id": current_id, "prompt": prompt, "status": status, "timestamp": time.time(), **fields}
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+async def _stream_to_file(response: aiohttp.ClientResponse, path: str) -> None:
+    """응답 본문을 임시 파일에 쓰고 완료되면 원자적으로 이름을 바꿉니다"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.part"
+    try:
+        with open(tmp_path, "wb") as f:
+            async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                f.write(chunk)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def validate_job(job: Any) -> Dict[str, Any]:
+    """
+    일괄 생성 작업을 검증하고 /generate 요청 본문을 반환합니다
+
+    Raises:
+        ValueError: 객체가 아니거나 prompt가 없는 경우
+        TypeError: JSON으로 직렬화할 수 없는 값이 있는 경우
+    """
+    if not isinstance(job, dict):
+        raise ValueError("작업은 {\"prompt\": ...} 형식의 객체여야 합니다")
+    if not isinstance(job.get("prompt"), str) or not job["prompt"].strip():
+        raise ValueError("작업에 prompt 문자열이 필요합니다")
+    payload = build_payload(**job)
+    json.dumps(payload)
+    return payload
+
+def load_jobs(path: str) -> List[Dict[str, Any]]:
+    """
+    작업 파일을 읽습니다
+
+    한 줄에 하나씩 프롬프트 문자열 또는 JSON 객체({"prompt": ..., ...})를 받습니다.
+    """
+    jobs = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                jobs.append(json.loads(line))
+            else:
+                jobs.append({"prompt": line})
+    return jobs
@@ -0,0 +1,105 @@
+"""
+Shared helpers for the Qwen Image Generator clients
+"""
+import hashlib
+import json
+import random
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Any, Dict, Mapping, Optional
+
+# Statuses the server uses for "try again later" (202: model loading, 429: GPU queue full)
+RETRY_STATUSES = frozenset({202, 429, 502, 503, 504})
+
+# Statuses the server returns before starting any work; the only ones safe to retry for POST
+# (a 502/504 from a proxy may mean the job is still running on the GPU)
+REJECTED_STATUSES = frozenset({202, 429, 503})
+
+DEFAULT_TIMEOUT = 300
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_BACKOFF = 1.0
+DEFAULT_MAX_BACKOFF = 60.0
+CHUNK_SIZE = 64 * 1024
+
+class ClientError(Exception):
+    """API 요청이 실패했을 때 발생하는 예외"""
+
+    def __init__(self, message: str, status: Optional[int] = None, payload: Optional[Dict[str, Any]] = None):
+        super().__init__(message)
+        self.status = status
+        self.payload = payload or {}
+
+class RetryExhaustedError(ClientError):
+    """재시도 횟수를 모두 사용했을 때 발생하는 예외"""
+
+def build_payload(prompt: str, **params) -> Dict[str, Any]:
+    """
+    /generate 요청 본문을 구성합니다
+
+    값이 None인 파라미터는 서버 기본값을 사용하도록 제외합니다.
+    """
+    payload = {"prompt": prompt}
+    payload.update({key: value for key, value in params.items() if value is not None})
+    return payload
+
+def job_id(payload: Mapping[str, Any], occurrence: int = 0) -> str:
+    """
+    요청 본문으로부터 재실행 시에도 동일한 작업 ID를 만듭니다
+
+    같은 본문이 여러 번 나오면 occurrence(몇 번째 등장인지)로 구분합니다.
+    """
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+    if occurrence:
+        encoded = f"{encoded}#{occurrence}"
+    return hashlib.sha1(encoded.encode()).hexdigest()[:16]
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After 헤더(초 또는 HTTP 날짜)를 대기 시간(초)으로 변환합니다"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+def retry_delay(
+    attempt: int,
+    retry_after: Optional[str] = None,
+    backoff: float = DEFAULT_BACKOFF,
+    max_backoff: float = DEFAULT_MAX_BACKOFF
+) -> float:
+    """
+    다음 재시도까지 대기할 시간을 계산합니다
+
+    서버가 Retry-After를 보내면 그 값을 따르고,
+    없으면 지터가 포함된 지수 백오프를 사용합니다.
+    """
+    delay = parse_retry_after(retry_after)
+    if delay is None:
+        delay = backoff * (2 ** attempt)
+        delay = delay / 2 + random.uniform(0, delay / 2)
+    return min(delay, max_backoff)
+
+def error_message(status: int, payload: Dict[str, Any], text: str = "") -> str:
+    """오류 응답에서 사람이 읽을 수 있는 메시지를 추출합니다"""
+    return payload.get("error") or payload.get("message") or text or f"HTTP {status}"
+
+def image_metadata(path: str, headers) -> Dict[str, Any]:
+    """PNG 응답 헤더에서 생성 파라미터를 추출합니다"""
+    seed = headers.get("X-Image-Seed")
+    return {
+        "path": path,
+        "width": int(headers.get("X-Image-Width", 0)) or None,
+        "height": int(headers.get("X-Image-Height", 0)) or None,
+        "num_inference_steps": int(headers.get("X-Image-Steps", 0)) or None,
+        "seed": int(seed) if seed else None,
+        "filename": headers.get("X-Image-Filename"),
+        "draft_id": headers.get("X-Draft-Id")
+    }
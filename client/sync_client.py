@@ -0,0 +1,217 @@
+"""
+Synchronous Qwen Image Generator client (pooled requests session)
+"""
+import logging
+import os
+import time
+from typing import Any, Dict
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+from .base import (
+    CHUNK_SIZE,
+    DEFAULT_BACKOFF,
+    DEFAULT_MAX_BACKOFF,
+    DEFAULT_MAX_RETRIES,
+    DEFAULT_TIMEOUT,
+    REJECTED_STATUSES,
+    RETRY_STATUSES,
+    ClientError,
+    RetryExhaustedError,
+    build_payload,
+    error_message,
+    image_metadata,
+    retry_delay,
+)
+
+logger = logging.getLogger(__name__)
+
+class QwenImageClient:
+    """연결 풀과 재시도를 지원하는 동기 API 클라이언트"""
+
+    def __init__(
+        self,
+        base_url: str = "http://localhost:5000",
+        timeout: float = DEFAULT_TIMEOUT,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        backoff: float = DEFAULT_BACKOFF,
+        max_backoff: float = DEFAULT_MAX_BACKOFF,
+        pool_size: int = 10
+    ):
+        """
+        Initialize the client
+
+        Args:
+            base_url: API 서버 URL
+            timeout: 요청 타임아웃(초)
+            max_retries: 202/429/5xx 및 연결 오류 재시도 횟수
+            backoff: 지수 백오프 기본 대기 시간(초)
+            max_backoff: 최대 대기 시간(초)
+            pool_size: 호스트당 유지할 연결 수
+        """
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self) -> None:
+        """연결 풀을 닫습니다"""
+        self.session.close()
+
+    def _request(self, method: str, path: str, retry: bool = True, **kwargs) -> requests.Response:
+        """
+        재시도 정책을 적용하여 요청을 보냅니다
+
+        POST는 서버가 작업을 시작하지 않은 경우(연결 실패, 202/429/503)에만
+        재시도합니다. 읽기 타임아웃이나 502/504 후에 다시 보내면 같은 작업이
+        GPU 대기열에 중복으로 쌓이기 때문입니다.
+
+        Raises:
+            RetryExhaustedError: 재시도 가능한 응답/오류가 한도를 넘은 경우
+            ClientError: 재시도할 수 없는 오류 응답인 경우
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        url = f"{self.base_url}{path}"
+        attempts = self.max_retries + 1 if retry else 1
+        idempotent = method.upper() != "POST"
+        retry_statuses = RETRY_STATUSES if idempotent else REJECTED_STATUSES
+
+        for attempt in range(attempts):
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if not idempotent and not _connect_failed(e):
+                    raise ClientError(f"요청 실패 (서버에서 작업이 계속 진행 중일 수 있음): {e}") from e
+                if attempt + 1 >= attempts:
+                    raise RetryExhaustedError(f"연결 실패: {e}") from e
+                delay = retry_delay(attempt, None, self.backoff, self.max_backoff)
+                logger.warning(f"연결 오류, {delay:.1f}초 후 재시도: {e}")
+                time.sleep(delay)
+                continue
+
+            if response.status_code in retry_statuses and attempt + 1 < attempts:
+                delay = retry_delay(attempt, response.headers.get("Retry-After"), self.backoff, self.max_backoff)
+                logger.info(f"서버 응답 {response.status_code}, {delay:.1f}초 후 재시도")
+                response.close()
+                time.sleep(delay)
+                continue
+
+            if response.status_code >= 400 or response.status_code in retry_statuses:
+                payload = self._json_or_empty(response)
+                error_class = RetryExhaustedError if response.status_code in retry_statuses else ClientError
+                raise error_class(
+                    error_message(response.status_code, payload, response.text),
+                    status=response.status_code,
+                    payload=payload
+                )
+
+            return response
+
+        raise RetryExhaustedError("재시도 횟수를 초과했습니다")
+
+    @staticmethod
+    def _json_or_empty(response: requests.Response) -> Dict[str, Any]:
+        """JSON 응답이면 파싱하고 아니면 빈 딕셔너리를 반환합니다"""
+        try:
+            payload = response.json()
+        except ValueError:
+            return {}
+        return payload if isinstance(payload, dict) else {}
+
+    def health(self) -> Dict[str, Any]:
+        """헬스체크 결과를 반환합니다 (재시도 없음, 로딩 중이면 status='loading')"""
+        try:
+            response = self.session.get(f"{self.base_url}/health", timeout=10)
+        except requests.RequestException as e:
+            raise ClientError(f"헬스체크 연결 실패: {e}") from e
+        payload = self._json_or_empty(response)
+        payload.setdefault("status", "error")
+        payload["http_status"] = response.status_code
+        return payload
+
+    def wait_until_ready(self, timeout: float = 300, interval: float = 5) -> bool:
+        """서비스가 준비될 때까지 기다립니다"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                if self.health().get("status") == "ready":
+                    return True
+            except ClientError as e:
+                logger.info(f"헬스체크 실패: {e}")
+            time.sleep(interval)
+        return False
+
+    def model_info(self) -> Dict[str, Any]:
+        """모델 정보를 반환합니다"""
+        return self._request("GET", "/model-info").json()["model_info"]
+
+    def generate(self, prompt: str, **params) -> Dict[str, Any]:
+        """
+        이미지를 생성하고 JSON 응답(image_base64 포함)을 반환합니다
+
+        큰 이미지를 여러 장 받을 때는 generate_to_file()을 사용하세요.
+        """
+        payload = build_payload(prompt, **params)
+        return self._request("POST", "/generate", json=payload).json()
+
+    def generate_to_file(self, prompt: str, path: str, **params) -> Dict[str, Any]:
+        """
+        이미지를 생성하고 PNG 바이트를 메모리에 모으지 않고 파일로 스트리밍합니다
+
+        Returns:
+            저장 경로와 응답 헤더의 생성 파라미터
+        """
+        payload = build_payload(prompt, response_format="png", **params)
+        response = self._request("POST", "/generate", json=payload, stream=True)
+        with response:
+            _stream_to_file(response.iter_content(CHUNK_SIZE), path)
+            return image_metadata(path, response.headers)
+
+    def refine(self, draft_id: str, **params) -> Dict[str, Any]:
+        """초안(generate(..., draft=True)의 draft_id)을 고해상도로 개선합니다"""
+        payload = {"draft_id": draft_id}
+        payload.update({key: value for key, value in params.items() if value is not None})
+        return self._request("POST", "/refine", json=payload).json()
+
+    def download_image(self, filename: str, path: str) -> str:
+        """서버에 저장된 이미지를 파일로 스트리밍합니다"""
+        response = self._request("GET", f"/images/{filename}", stream=True)
+        with response:
+            _stream_to_file(response.iter_content(CHUNK_SIZE), path)
+        return path
+
+def _connect_failed(error: requests.RequestException) -> bool:
+    """요청이 서버에 전달되기 전(연결 단계)에 실패했는지 확인합니다"""
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(reason, NewConnectionError)
+
+def _stream_to_file(chunks, path: str) -> None:
+    """청크를 임시 파일에 쓰고 완료되면 원자적으로 이름을 바꿉니다"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.part"
+    try:
+        with open(tmp_path, "wb") as f:
+            for chunk in chunks:
+                if chunk:
+                    f.write(chunk)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+특징 재사용 가속(FeatureCache) CPU 벤치마크
+
+랜덤 초기화 모델은 단계 간 특징이 전혀 이어지지 않아 캐시 재사용 효과를
+측정할 수 없으므로, 합성 도형 이미지로 작은 픽셀 공간 UNet을 짧게 학습한 뒤
+(가중치는 --weights에 캐시) 전체 계산과 캐시 재사용을 비교합니다.
+config의 가속 프리셋마다 속도 향상과 PSNR 기준을 검사하고, 하나라도 기준에
+못 미치면 종료 코드 1을 반환합니다. 모델 다운로드나 GPU가 필요하지 않습니다.
+
+사용법:
+    python scripts/benchmark_feature_cache.py
+    python scripts/benchmark_feature_cache.py --presets fast --steps 30
+    python scripts/benchmark_feature_cache.py --interval 4 --depth 1   # 사용자 설정 추가 측정
+"""
+
+import argparse
+import math
+import os
+import sys
+import time
+
+import torch
+from diffusers import DDIMScheduler, DDPMScheduler, UNet2DConditionModel
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from app.core.config import Config  # noqa: E402
+from app.core.feature_cache import FeatureCache, resolve_acceleration  # noqa: E402
+
+IMAGE_SIZE = 16
+NUM_CLASSES = 4
+PROMPT_TOKENS = 4
+EMBED_DIM = 32
+
+# Pass/fail thresholds per preset (PSNR against the full-compute image)
+PRESET_THRESHOLDS = {
+    "balanced": {"min_speedup": 1.3, "min_psnr": 32.0},
+    "fast": {"min_speedup": 1.5, "min_psnr": 28.0},
+}
+DEFAULT_THRESHOLDS = {"min_speedup": 1.2, "min_psnr": 25.0}
+
+def build_unet() -> UNet2DConditionModel:
+    """3단계 해상도(16/8/4)의 작은 조건부 UNet을 생성합니다"""
+    return UNet2DConditionModel(
+        sample_size=IMAGE_SIZE,
+        in_channels=3,
+        out_channels=3,
+        layers_per_block=1,
+        block_out_channels=(32, 64, 128),
+        down_block_types=("DownBlock2D", "CrossAttnDownBlock2D", "CrossAttnDownBlock2D"),
+        up_block_types=("CrossAttnUpBlock2D", "CrossAttnUpBlock2D", "UpBlock2D"),
+        cross_attention_dim=EMBED_DIM,
+        attention_head_dim=8,
+        norm_num_groups=16,
+    )
+
+def prompt_embeddings(seed: int) -> torch.Tensor:
+    """클래스별 고정 '프롬프트' 임베딩 (0번은 무조건부)"""
+    generator = torch.Generator().manual_seed(seed)
+    return torch.randn((NUM_CLASSES + 1, PROMPT_TOKENS, EMBED_DIM), generator=generator)
+
+def sample_shapes(classes: torch.Tensor, generator: torch.Generator) -> torch.Tensor:
+    """클래스별 색/모양(원, 사각형)의 도형을 그라디언트 배경 위에 그립니다 ([-1, 1])"""
+    coords = torch.linspace(-1, 1, IMAGE_SIZE)
+    yy, xx = torch.meshgrid(coords, coords, indexing="ij")
+    colors = torch.tensor([[1.0, -1.0, -1.0], [-1.0, 1.0, -1.0], [-1.0, -1.0, 1.0], [1.0, 1.0, -1.0]])
+
+    images = []
+    for label in classes.tolist():
+        cx, cy = (torch.rand(2, generator=generator) * 1.2 - 0.6).tolist()
+        radius = 0.25 + 0.2 * torch.rand(1, generator=generator).item()
+        if label % 2:
+            mask = ((xx - cx) ** 2 + (yy - cy) ** 2 < radius ** 2).float()
+        else:
+            mask = (((xx - cx).abs() < radius) & ((yy - cy).abs() < radius)).float()
+        mask = torch.nn.functional.avg_pool2d(mask[None, None], 3, 1, 1)[0, 0]
+        background = (-0.5 + 0.3 * yy)[None]
+        images.append(background * (1 - mask) + colors[label - 1][:, None, None] * mask)
+    return torch.stack(images)
+
+def train_unet(args, prompts: torch.Tensor) -> UNet2DConditionModel:
+    """합성 도형 데이터로 UNet을 짧게 학습합니다 (CFG용 10% 무조건부)"""
+    torch.manual_seed(args.seed)
+    unet = build_unet()
+    scheduler = DDPMScheduler(num_train_timesteps=1000)
+    optimizer = torch.optim.AdamW(unet.parameters(), lr=args.lr)
+    generator = torch.Generator().manual_seed(args.seed)
+
+    print(f"🏋️ 벤치마크 모델 학습 중 ({args.train_steps} 단계)...")
+    start = time.perf_counter()
+    for step in range(args.train_steps):
+        classes = torch.randint(1, NUM_CLASSES + 1, (args.train_batch,), generator=generator)
+        images = sample_shapes(classes, generator)
+        classes = torch.where(torch.rand(args.train_batch, generator=generator) < 0.1, 0, classes)
+        noise = torch.randn(images.shape, generator=generator)
+        timesteps = torch.randint(0, 1000, (args.train_batch,), generator=generator)
+
+        prediction = unet(scheduler.add_noise(images, noise, timesteps), timesteps,
+                          encoder_hidden_states=prompts[classes]).sample
+        loss = torch.nn.functional.mse_loss(prediction, noise)
+        optimizer.zero_grad()
+        loss.backward()
+        optimizer.step()
+
+        # Cosine decay to zero
+        for group in optimizer.param_groups:
+            group["lr"] = args.lr * 0.5 * (1 + math.cos(math.pi * (step + 1) / args.train_steps))
+        if step % 100 == 0 or step + 1 == args.train_steps:
+            print(f"  단계 {step}: loss={loss.item():.4f} ({time.perf_counter() - start:.0f}s)")
+
+    return unet
+
+def load_unet(args, prompts: torch.Tensor) -> UNet2DConditionModel:
+    """캐시된 가중치가 있으면 불러오고, 없으면 학습 후 저장합니다"""
+    unet = build_unet()
+    if os.path.exists(args.weights) and not args.retrain:
+        unet.load_state_dict(torch.load(args.weights, map_location="cpu"))
+        print(f"📦 학습된 가중치 사용: {args.weights}")
+    else:
+        unet = train_unet(args, prompts)
+        directory = os.path.dirname(args.weights)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        torch.save(unet.state_dict(), args.weights)
+        print(f"💾 가중치 저장됨: {args.weights}")
+    return unet.eval()
+
+@torch.no_grad()
+def denoise(unet, prompts: torch.Tensor, args, steps=None):
+    """DDIM + CFG 루프로 클래스별 이미지를 생성하고 소요 시간을 반환합니다"""
+    scheduler = DDIMScheduler(num_train_timesteps=1000)
+    scheduler.set_timesteps(steps or args.steps)
+
+    generator = torch.Generator().manual_seed(args.seed + 1)
+    sample = torch.randn((args.batch, 3, IMAGE_SIZE, IMAGE_SIZE), generator=generator)
+    classes = torch.arange(args.batch) % NUM_CLASSES + 1
+    embeddings = torch.cat([prompts[torch.zeros_like(classes)], prompts[classes]])
+
+    start = time.perf_counter()
+    for t in scheduler.timesteps:
+        # Batched classifier-free guidance, one denoiser call per step
+        noise = unet(torch.cat([sample] * 2), t, encoder_hidden_states=embeddings).sample
+        noise_uncond, noise_text = noise.chunk(2)
+        noise = noise_uncond + args.guidance * (noise_text - noise_uncond)
+        sample = scheduler.step(noise, t, sample).prev_sample
+    elapsed = time.perf_counter() - start
+
+    return sample.clamp(-1, 1), elapsed
+
+def psnr(a: torch.Tensor, b: torch.Tensor) -> float:
+    """[-1, 1] 범위 이미지의 PSNR(dB)을 계산합니다"""
+    mse = torch.mean(((a - b) / 2) ** 2).item()
+    return float("inf") if mse == 0 else 10 * math.log10(1.0 / mse)
+
+def cosine(a: torch.Tensor, b: torch.Tensor) -> float:
+    """두 텐서의 코사인 유사도를 계산합니다"""
+    return torch.nn.functional.cosine_similarity(a.flatten(), b.flatten(), dim=0).item()
+
+def measure(unet, prompts, args, settings):
+    """전체 계산과 캐시 재사용을 번갈아 실행하여 최소 시간과 유사도를 측정합니다"""
+    feature_cache = FeatureCache(unet, **settings)
+    full_times, cached_times = [], []
+    for _ in range(args.runs):
+        full_images, elapsed = denoise(unet, prompts, args)
+        full_times.append(elapsed)
+        with feature_cache.attach():
+            cached_images, elapsed = denoise(unet, prompts, args)
+            stats = feature_cache.stats()
+        cached_times.append(elapsed)
+
+    return {
+        "speedup": min(full_times) / min(cached_times),
+        "psnr": psnr(full_images, cached_images),
+        "cosine": cosine(full_images, cached_images),
+        "full_time": min(full_times),
+        "cached_time": min(cached_times),
+        "stats": stats,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="FeatureCache CPU 벤치마크")
+    parser.add_argument("--presets", nargs="*", default=None, help="검사할 프리셋 (기본값: config의 모든 가속 프리셋)")
+    parser.add_argument("--steps", type=int, default=25, help="디노이징 단계 수")
+    parser.add_argument("--batch", type=int, default=4, help="생성 배치 크기")
+    parser.add_argument("--guidance", type=float, default=4.0, help="가이던스 스케일")
+    parser.add_argument("--runs", type=int, default=3, help="반복 측정 횟수")
+    parser.add_argument("--seed", type=int, default=0, help="랜덤 시드")
+    parser.add_argument("--threads", type=int, default=None, help="torch CPU 스레드 수")
+    parser.add_argument("--weights", default=os.path.join(os.path.expanduser("~"), ".cache", "qwen_image",
+                                                          "feature_cache_bench_unet.pt"),
+                        help="학습된 벤치마크 모델 가중치 캐시 경로")
+    parser.add_argument("--retrain", action="store_true", help="캐시된 가중치를 무시하고 다시 학습")
+    parser.add_argument("--train-steps", type=int, default=300, help="학습 단계 수")
+    parser.add_argument("--train-batch", type=int, default=16, help="학습 배치 크기")
+    parser.add_argument("--lr", type=float, default=2e-3, help="학습률")
+    parser.add_argument("--interval", type=int, help="사용자 설정: 전체 계산 주기 (지정하면 'custom'도 측정)")
+    parser.add_argument("--depth", type=int, default=1, help="사용자 설정: 매 단계 계산할 얕은 블록 수")
+    parser.add_argument("--warmup", type=int, default=1, help="사용자 설정: 초기 전체 계산 단계 수")
+    parser.add_argument("--guard-every", type=int, default=4, help="사용자 설정: 품질 검사 주기 (0이면 비활성화)")
+    parser.add_argument("--max-drift", type=float, default=0.15, help="사용자 설정: 허용 상대 오차")
+    parser.add_argument("--min-speedup", type=float, help="모든 설정에 적용할 최소 속도 향상 (프리셋 기준 대신)")
+    parser.add_argument("--min-psnr", type=float, help="모든 설정에 적용할 최소 PSNR(dB) (프리셋 기준 대신)")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    config = Config()
+    presets = args.presets if args.presets is not None else [
+        name for name, preset in config.FEATURE_CACHE_PRESETS.items() if preset is not None
+    ]
+    runs = [(name, resolve_acceleration(name, config)) for name in presets]
+    if args.interval:
+        runs.append(("custom", {
+            "interval": args.interval,
+            "depth": args.depth,
+            "warmup_steps": args.warmup,
+            "guard_every": args.guard_every,
+            "max_drift": args.max_drift,
+        }))
+
+    prompts = prompt_embeddings(args.seed)
+    unet = load_unet(args, prompts)
+
+    # Warm up kernels and allocator before timing
+    denoise(unet, prompts, args, steps=2)
+
+    print("🧪 FeatureCache CPU 벤치마크")
+    print(f"설정: steps={args.steps}, batch={args.batch}, runs={args.runs}")
+
+    failures = []
+    for name, settings in runs:
+        if settings is None:
+            print(f"- {name}: 가속 없음, 건너뜀")
+            continue
+
+        thresholds = dict(PRESET_THRESHOLDS.get(name, DEFAULT_THRESHOLDS))
+        if args.min_speedup is not None:
+            thresholds["min_speedup"] = args.min_speedup
+        if args.min_psnr is not None:
+            thresholds["min_psnr"] = args.min_psnr
+
+        result = measure(unet, prompts, args, settings)
+        stats = result["stats"]
+        problems = []
+        if result["speedup"] < thresholds["min_speedup"]:
+            problems.append(f"속도 향상 {result['speedup']:.2f}x < {thresholds['min_speedup']}x")
+        if result["psnr"] < thresholds["min_psnr"]:
+            problems.append(f"PSNR {result['psnr']:.2f}dB < {thresholds['min_psnr']}dB")
+        if stats["fallback"]:
+            problems.append("품질 검사로 전체 계산 전환됨")
+
+        print(f"\n[{'PASS' if not problems else 'FAIL'}] {name}: {settings}")
+        print(f"  전체 계산: {result['full_time']:.3f}s / 캐시 재사용: {result['cached_time']:.3f}s")
+        print(f"  속도 향상: {result['speedup']:.2f}x (기준 {thresholds['min_speedup']}x)")
+        print(f"  PSNR: {result['psnr']:.2f} dB (기준 {thresholds['min_psnr']} dB)")
+        print(f"  코사인 유사도: {result['cosine']:.4f}")
+        print(f"  통계: {stats}")
+        for problem in problems:
+            print(f"  ❌ {problem}")
+        if problems:
+            failures.append(name)
+
+    if failures:
+        print(f"\n❌ 기준 미달: {', '.join(failures)}")
+        sys.exit(1)
+    print("\n✅ 모든 설정이 기준을 통과했습니다")
+
+if __name__ == "__main__":
+    main()
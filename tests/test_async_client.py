@@ -0,0 +1,144 @@
+"""
+asyncio 클라이언트 재시도 정책과 일괄 생성(매니페스트, 재개, 작업별 실패) 테스트
+"""
+import asyncio
+import json
+import os
+
+import pytest
+
+aiohttp = pytest.importorskip("aiohttp")
+from aiohttp import web
+
+from client.async_client import AsyncQwenImageClient, BulkManifest
+from client.base import ClientError, RetryExhaustedError, build_payload, job_id
+
+class StubServer:
+    """/generate 요청을 프롬프트별 규칙으로 처리하는 aiohttp 서버"""
+
+    def __init__(self):
+        self.calls = []
+        self.statuses = {}
+
+    async def generate(self, request):
+        body = await request.json()
+        prompt = body["prompt"]
+        self.calls.append(prompt)
+
+        statuses = self.statuses.get(prompt)
+        if statuses:
+            status = statuses.pop(0) if len(statuses) > 1 else statuses[0]
+            if status != 200:
+                return web.json_response({"success": False, "error": f"HTTP {status}"}, status=status,
+                                         headers={"Retry-After": "0"})
+
+        if prompt == "broken":
+            # Declares more bytes than it sends, then drops the connection mid-stream
+            response = web.StreamResponse(headers={"Content-Length": "1000"})
+            await response.prepare(request)
+            await response.write(b"PNG")
+            request.transport.close()
+            return response
+
+        return web.Response(body=f"PNG:{prompt}".encode(), content_type="image/png",
+                            headers={"X-Image-Seed": "42", "X-Image-Width": "64", "X-Image-Height": "64"})
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_post("/generate", self.generate)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}"
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.runner.cleanup()
+
+def run(coro):
+    return asyncio.run(coro)
+
+def read_manifest(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+def test_post_retries_only_rejected_statuses():
+    async def scenario():
+        async with StubServer() as server:
+            server.statuses = {"busy": [429, 200], "gateway": [504]}
+            async with AsyncQwenImageClient(server.url, max_retries=2, backoff=0.01) as client:
+                result = await client._request("POST", "/generate", json=build_payload("busy"))
+                result.release()
+                with pytest.raises(ClientError) as exc_info:
+                    await client._request("POST", "/generate", json=build_payload("gateway"))
+            return server.calls, exc_info.value
+
+    calls, error = run(scenario())
+    assert calls.count("busy") == 2
+    assert calls.count("gateway") == 1
+    assert error.status == 504 and not isinstance(error, RetryExhaustedError)
+
+def test_bulk_generate_isolates_failures_and_separates_duplicates(tmp_path):
+    jobs = [
+        {"prompt": "a cat"},
+        {"prompt": "a cat"},
+        {"prompt": "a dog"},
+        {"prompt": "broken"},
+        {"width": 512},
+        {"prompt": "a fish", "extra": object()},
+    ]
+
+    async def scenario():
+        async with StubServer() as server:
+            async with AsyncQwenImageClient(server.url, max_retries=0, timeout=5) as client:
+                return await client.bulk_generate(jobs, str(tmp_path), concurrency=4)
+
+    counts = run(scenario())
+    assert counts == {"done": 3, "skipped": 0, "failed": 3}
+
+    entries = read_manifest(tmp_path / "manifest.jsonl")
+    done = [entry for entry in entries if entry["status"] == "done"]
+    failed = {entry["id"]: entry for entry in entries if entry["status"] == "failed"}
+
+    cat_ids = {job_id({"prompt": "a cat"}, 0), job_id({"prompt": "a cat"}, 1)}
+    assert cat_ids <= {entry["id"] for entry in done}
+    for entry in done:
+        with open(entry["path"], "rb") as f:
+            assert f.read() == f"PNG:{entry['prompt']}".encode()
+        assert entry["seed"] == 42
+
+    assert "invalid-4" in failed and "prompt" in failed["invalid-4"]["error"]
+    assert "invalid-5" in failed and failed["invalid-5"]["prompt"] == "a fish"
+    assert job_id({"prompt": "broken"}) in failed
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".part")]
+
+def test_bulk_generate_resumes_from_manifest(tmp_path):
+    jobs = [{"prompt": "a cat"}, {"prompt": "a cat"}, {"prompt": "a dog"}]
+
+    async def scenario():
+        async with StubServer() as server:
+            async with AsyncQwenImageClient(server.url, max_retries=0) as client:
+                first = await client.bulk_generate(jobs[:2], str(tmp_path))
+                second = await client.bulk_generate(jobs, str(tmp_path))
+            return first, second, server.calls
+
+    first, second, calls = run(scenario())
+    assert first == {"done": 2, "skipped": 0, "failed": 0}
+    assert second == {"done": 1, "skipped": 2, "failed": 0}
+    assert calls == ["a cat", "a cat", "a dog"]
+
+def test_manifest_completed_ids_tolerates_missing_and_truncated_files(tmp_path):
+    manifest = BulkManifest(str(tmp_path / "nested" / "manifest.jsonl"))
+    assert manifest.completed_ids() == set()
+
+    image = tmp_path / "kept.png"
+    image.write_bytes(b"PNG")
+    manifest.record("kept", "a cat", "done", path=str(image))
+    manifest.record("deleted", "a dog", "done", path=str(tmp_path / "deleted.png"))
+    manifest.record("broken", "a fish", "failed", error="boom")
+    with open(manifest.path, "a", encoding="utf-8") as f:
+        f.write('{"id": "interrupted", "status": "do')
+
+    assert manifest.completed_ids() == {"kept"}
@@ -0,0 +1,45 @@
+"""
+클라이언트 공통 로직(Retry-After 해석, 백오프, 작업 ID) 테스트
+"""
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+
+from client.base import job_id, parse_retry_after, retry_delay
+
+def test_parse_retry_after_seconds():
+    assert parse_retry_after("10") == 10.0
+    assert parse_retry_after("1.5") == 1.5
+    assert parse_retry_after("-3") == 0.0
+
+def test_parse_retry_after_http_date():
+    future = datetime.now(timezone.utc) + timedelta(seconds=30)
+    assert 25 <= parse_retry_after(format_datetime(future, usegmt=True)) <= 30
+
+    past = datetime.now(timezone.utc) - timedelta(minutes=5)
+    assert parse_retry_after(format_datetime(past, usegmt=True)) == 0.0
+
+@pytest.mark.parametrize("value", [None, "", "soon"])
+def test_parse_retry_after_invalid(value):
+    assert parse_retry_after(value) is None
+
+def test_retry_delay_prefers_retry_after_but_caps_it():
+    assert retry_delay(0, "7", backoff=1.0, max_backoff=60.0) == 7.0
+    assert retry_delay(0, "600", backoff=1.0, max_backoff=60.0) == 60.0
+
+def test_retry_delay_exponential_backoff_with_jitter():
+    for attempt in range(4):
+        delay = retry_delay(attempt, None, backoff=1.0, max_backoff=60.0)
+        assert 2 ** attempt / 2 <= delay <= 2 ** attempt
+    assert retry_delay(10, None, backoff=1.0, max_backoff=5.0) == 5.0
+
+def test_job_id_is_stable_and_order_independent():
+    assert job_id({"prompt": "a cat", "width": 512}) == job_id({"width": 512, "prompt": "a cat"})
+    assert job_id({"prompt": "a cat"}) != job_id({"prompt": "a dog"})
+
+def test_job_id_occurrence_separates_duplicates():
+    payload = {"prompt": "a cat"}
+    assert job_id(payload, 0) == job_id(payload)
+    ids = {job_id(payload, occurrence) for occurrence in range(3)}
+    assert len(ids) == 3
@@ -0,0 +1,232 @@
+"""
+GPUExecutor 2단계 파이프라인(GPU 스레드 → 후처리 프로세스 풀) 테스트
+"""
+import base64
+import io
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+import pytest
+
+Image = pytest.importorskip("PIL.Image")
+
+from app.core.config import Config
+from app.core.gpu_executor import GPUExecutor, QueueFullError
+
+class ManualPool:
+    """제출된 후처리 작업을 테스트가 직접 완료시키는 프로세스 풀 대역"""
+
+    def __init__(self):
+        self.futures = []
+        self.submitted = threading.Condition()
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        with self.submitted:
+            self.futures.append(future)
+            self.submitted.notify_all()
+        return future
+
+    def wait_for(self, count, timeout=5):
+        with self.submitted:
+            assert self.submitted.wait_for(lambda: len(self.futures) >= count, timeout)
+
+    def shutdown(self, wait=True):
+        pass
+
+def make_config(tmp_path, **overrides):
+    config = Config()
+    config.OUTPUT_DIR = str(tmp_path)
+    config.GPU_WORKERS = 1
+    config.GPU_QUEUE_LIMIT = 8
+    config.PIPELINE_POSTPROCESS = True
+    config.POSTPROCESS_WORKERS = 1
+    config.POSTPROCESS_QUEUE_LIMIT = 2
+    for key, value in overrides.items():
+        setattr(config, key, value)
+    return config
+
+def fake_generate(prompt, num_images=1, postprocess=None, **kwargs):
+    """generate_image()처럼 PIL 이미지를 만들어 후처리 단계로 넘깁니다"""
+    response = {"success": True, "prompt": prompt}
+    images = [Image.new("RGB", (16, 8), (i * 60, 0, 0)) for i in range(num_images)]
+    if num_images > 1:
+        response["drafts"] = [{"draft_id": f"d{i}"} for i in range(num_images)]
+    postprocess(response, images)
+    return response
+
+def wait_until(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+@pytest.fixture
+def executor_factory(tmp_path):
+    executors = []
+
+    def factory(**overrides):
+        executor = GPUExecutor(make_config(tmp_path, **overrides))
+        executors.append(executor)
+        return executor
+
+    yield factory
+    for executor in executors:
+        executor.shutdown()
+
+def decode_png(image_base64):
+    return Image.open(io.BytesIO(base64.b64decode(image_base64)))
+
+def test_pipelined_job_encodes_drafts_and_saves(executor_factory):
+    executor = executor_factory()
+
+    result = executor.submit_image_job(fake_generate, save_image=True, prompt="a cat", num_images=2).result(timeout=60)
+
+    assert result["success"] is True
+    assert "images" not in result
+    assert decode_png(result["image_base64"]).size == (16, 8)
+    assert [draft["draft_id"] for draft in result["drafts"]] == ["d0", "d1"]
+    assert decode_png(result["drafts"][1]["image_base64"]).getpixel((0, 0)) == (60, 0, 0)
+    assert os.path.exists(result["saved_path"])
+    assert result["filename"] == os.path.basename(result["saved_path"])
+
+    stats = executor.stats()
+    assert stats["pipelined"] is True
+    assert stats["stages"]["gpu"]["completed"] == 1
+    assert stats["stages"]["postprocess"]["completed"] == 1
+    assert executor.in_flight == 0
+
+def test_backpressure_blocks_gpu_thread_until_slot_frees(executor_factory):
+    executor = executor_factory(POSTPROCESS_QUEUE_LIMIT=1)
+    pool = executor._post_pool
+    executor._post_pool = ManualPool()
+    pool.shutdown()
+
+    first = executor.submit_image_job(fake_generate, prompt="first")
+    executor._post_pool.wait_for(1)
+    second = executor.submit_image_job(fake_generate, prompt="second")
+
+    # The second job finished on the GPU but waits for the only post-processing slot
+    assert wait_until(lambda: executor.stats()["stages"]["gpu"]["running"] == 1)
+    time.sleep(0.1)
+    assert len(executor._post_pool.futures) == 1
+    assert not first.done() and not second.done()
+    assert executor.in_flight == 2
+
+    executor._post_pool.futures[0].set_result(("Zmlyc3Q=", 0.5))
+    assert first.result(timeout=5)["image_base64"] == "Zmlyc3Q="
+
+    executor._post_pool.wait_for(2)
+    executor._post_pool.futures[1].set_result(("c2Vjb25k", 0.25))
+    assert second.result(timeout=5)["image_base64"] == "c2Vjb25k"
+
+    stats = executor.stats()["stages"]
+    assert stats["gpu"]["blocked_seconds"] > 0
+    assert stats["postprocess"]["completed"] == 2
+    assert stats["postprocess"]["busy_seconds"] == 0.75
+    assert executor.in_flight == 0
+
+def test_gpu_failure_propagates_to_future(executor_factory):
+    executor = executor_factory()
+
+    def missing_draft(**kwargs):
+        raise KeyError("draft")
+
+    future = executor.submit_image_job(missing_draft, prompt="x")
+    with pytest.raises(KeyError):
+        future.result(timeout=5)
+
+    stats = executor.stats()["stages"]
+    assert stats["gpu"]["failed"] == 1
+    assert stats["postprocess"]["completed"] == 0
+    assert executor.in_flight == 0
+
+def test_error_result_without_handoff_is_returned(executor_factory):
+    executor = executor_factory()
+
+    def failed_generation(prompt, postprocess=None):
+        return {"success": False, "error": "CUDA out of memory", "prompt": prompt}
+
+    result = executor.submit_image_job(failed_generation, prompt="x").result(timeout=5)
+    assert result == {"success": False, "error": "CUDA out of memory", "prompt": "x"}
+
+def test_postprocess_failure_propagates_and_releases_slot(executor_factory):
+    executor = executor_factory(POSTPROCESS_QUEUE_LIMIT=1)
+    pool = executor._post_pool
+    executor._post_pool = ManualPool()
+    pool.shutdown()
+
+    failing = executor.submit_image_job(fake_generate, prompt="disk full")
+    executor._post_pool.wait_for(1)
+    executor._post_pool.futures[0].set_exception(OSError("No space left on device"))
+    with pytest.raises(OSError):
+        failing.result(timeout=5)
+
+    # The slot was returned, so the next job reaches the CPU stage
+    following = executor.submit_image_job(fake_generate, prompt="next")
+    executor._post_pool.wait_for(2)
+    executor._post_pool.futures[1].set_result(("b2s=", 0.1))
+    assert following.result(timeout=5)["image_base64"] == "b2s="
+
+    stats = executor.stats()["stages"]["postprocess"]
+    assert stats["failed"] == 1
+    assert stats["completed"] == 1
+    assert stats["pending"] == 0 and stats["running"] == 0
+
+def test_queue_limit_rejects_new_jobs(executor_factory):
+    executor = executor_factory(GPU_QUEUE_LIMIT=1)
+    release = threading.Event()
+
+    def blocking(**kwargs):
+        release.wait(5)
+        return {"success": True}
+
+    running = executor.submit(blocking)
+    assert wait_until(lambda: executor.stats()["running"] == 1)
+    queued = executor.submit(blocking)
+    with pytest.raises(QueueFullError):
+        executor.submit_image_job(fake_generate, prompt="x")
+
+    release.set()
+    assert running.result(timeout=5) == {"success": True}
+    assert queued.result(timeout=5) == {"success": True}
+    assert executor.stats()["rejected"] == 1
+
+def test_unpipelined_mode_runs_fn_inline(executor_factory):
+    executor = executor_factory(PIPELINE_POSTPROCESS=False)
+
+    def generate(prompt, save_image=False):
+        return {"success": True, "prompt": prompt, "save_image": save_image}
+
+    result = executor.submit_image_job(generate, save_image=True, prompt="x").result(timeout=5)
+    assert result == {"success": True, "prompt": "x", "save_image": True}
+    assert executor.stats()["stages"]["postprocess"] is None
+
+def test_cancelled_queued_job_releases_its_slot(executor_factory):
+    executor = executor_factory(PIPELINE_POSTPROCESS=False, GPU_QUEUE_LIMIT=1)
+    release = threading.Event()
+
+    def blocking(**kwargs):
+        release.wait(5)
+        return {"success": True}
+
+    running = executor.submit(blocking)
+    assert wait_until(lambda: executor.stats()["running"] == 1)
+    queued = executor.submit(blocking)
+
+    # A client disconnect cancels the still-queued future via asyncio.wrap_future
+    assert queued.cancel()
+    assert executor.stats()["pending"] == 0
+    assert executor.in_flight == 1
+
+    # The freed slot accepts new work instead of answering 429
+    replacement = executor.submit(blocking)
+    release.set()
+    assert running.result(timeout=5) == {"success": True}
+    assert replacement.result(timeout=5) == {"success": True}
+    assert executor.in_flight == 0
+    assert executor.stats()["rejected"] == 0
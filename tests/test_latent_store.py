@@ -0,0 +1,78 @@
+"""
+LatentStore LRU/용량/유효기간 제거 테스트
+"""
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from app.core import latent_store as latent_store_module
+from app.core.config import Config
+from app.core.latent_store import LatentStore
+
+def make_store(max_entries=4, max_mb=1, ttl=0):
+    config = Config()
+    config.LATENT_STORE_MAX_ENTRIES = max_entries
+    config.LATENT_STORE_MAX_MB = max_mb
+    config.LATENT_STORE_TTL = ttl
+    return LatentStore(config)
+
+def latent(kib=64):
+    # float32: 256 elements per KiB
+    return torch.zeros(1, 4, 8, kib * 8)
+
+def test_put_copies_to_cpu_and_get_returns_entry():
+    store = make_store()
+    source = latent()
+    draft_id = store.put(source, {"prompt": "a cat"})
+
+    entry = store.get(draft_id)
+    assert entry.params == {"prompt": "a cat"}
+    assert entry.latents.device.type == "cpu"
+    source.fill_(1)
+    assert entry.latents.sum().item() == 0
+    assert store.get("missing") is None
+
+def test_entry_limit_evicts_least_recently_used():
+    store = make_store(max_entries=2)
+    first = store.put(latent(), {})
+    second = store.put(latent(), {})
+    store.get(first)
+    third = store.put(latent(), {})
+
+    assert store.get(second) is None
+    assert store.get(first) is not None
+    assert store.get(third) is not None
+    assert store.stats()["evicted"] == 1
+
+def test_byte_limit_evicts_until_under_budget():
+    store = make_store(max_entries=100, max_mb=1)
+    ids = [store.put(latent(kib=256), {}) for _ in range(5)]
+
+    stats = store.stats()
+    assert stats["entries"] == 4
+    assert stats["bytes"] <= stats["max_bytes"]
+    assert store.get(ids[0]) is None
+    assert all(store.get(draft_id) is not None for draft_id in ids[1:])
+
+def test_oversized_latent_is_not_stored():
+    store = make_store(max_mb=1)
+    kept = store.put(latent(), {})
+
+    assert store.put(latent(kib=2048), {}) is None
+    assert store.get(kept) is not None
+    assert store.stats()["entries"] == 1
+    assert store.stats()["evicted"] == 0
+
+def test_expired_entries_are_dropped(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(latent_store_module.time, "time", lambda: now[0])
+    store = make_store(ttl=60)
+    old = store.put(latent(), {})
+
+    now[0] += 30
+    fresh = store.put(latent(), {})
+    now[0] += 45
+
+    assert store.get(old) is None
+    assert store.get(fresh) is not None
+    assert store.stats()["entries"] == 1
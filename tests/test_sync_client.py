@@ -0,0 +1,125 @@
+"""
+동기 클라이언트 재시도 정책 테스트 (로컬 스텁 HTTP 서버 사용)
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+requests = pytest.importorskip("requests")
+from urllib3.exceptions import MaxRetryError, NewConnectionError, ProtocolError
+
+from client.base import ClientError, RetryExhaustedError
+from client.sync_client import QwenImageClient, _connect_failed
+
+class StubServer:
+    """경로별로 정해진 응답 순서를 돌려주는 HTTP 서버"""
+
+    def __init__(self):
+        self.responses = {}
+        self.calls = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _respond(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                self.rfile.read(length)
+                server.calls.append((self.command, self.path))
+                queue = server.responses[(self.command, self.path)]
+                status, body, delay = queue.pop(0) if len(queue) > 1 else queue[0]
+                if delay:
+                    time.sleep(delay)
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.send_header("Retry-After", "0")
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = _respond
+            do_POST = _respond
+
+        class QuietServer(ThreadingHTTPServer):
+            def handle_error(self, request, client_address):
+                # The client hanging up after a read timeout is expected here
+                pass
+
+        self.httpd = QuietServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def on(self, method, path, *responses):
+        self.responses[(method, path)] = [r if len(r) == 3 else (*r, 0) for r in responses]
+
+    def count(self, method, path):
+        return self.calls.count((method, path))
+
+@pytest.fixture
+def server():
+    stub = StubServer()
+    yield stub
+    stub.httpd.shutdown()
+
+@pytest.fixture
+def client(server):
+    with QwenImageClient(server.url, timeout=0.5, max_retries=2, backoff=0.01) as client:
+        yield client
+
+def test_post_retries_rejected_statuses_until_success(server, client):
+    server.on("POST", "/generate", (429, {"error": "busy"}), (202, {"status": "loading"}), (200, {"success": True}))
+    assert client.generate("a cat") == {"success": True}
+    assert server.count("POST", "/generate") == 3
+
+def test_post_gives_up_after_max_retries(server, client):
+    server.on("POST", "/generate", (429, {"error": "busy"}))
+    with pytest.raises(RetryExhaustedError) as exc_info:
+        client.generate("a cat")
+    assert exc_info.value.status == 429
+    assert server.count("POST", "/generate") == 3
+
+@pytest.mark.parametrize("status", [502, 504])
+def test_post_does_not_retry_proxy_errors(server, client, status):
+    server.on("POST", "/generate", (status, {"error": "gateway"}))
+    with pytest.raises(ClientError) as exc_info:
+        client.generate("a cat")
+    assert not isinstance(exc_info.value, RetryExhaustedError)
+    assert server.count("POST", "/generate") == 1
+
+def test_post_does_not_retry_read_timeout(server, client):
+    server.on("POST", "/generate", (200, {"success": True}, 1.0))
+    with pytest.raises(ClientError):
+        client.generate("a cat")
+    assert server.count("POST", "/generate") == 1
+
+def test_get_retries_gateway_errors(server, client):
+    server.on("GET", "/model-info", (504, {}), (200, {"success": True, "model_info": {"name": "qwen"}}))
+    assert client.model_info() == {"name": "qwen"}
+    assert server.count("GET", "/model-info") == 2
+
+def test_client_errors_are_not_retried(server, client):
+    server.on("POST", "/generate", (400, {"success": False, "error": "프롬프트가 필요합니다"}))
+    with pytest.raises(ClientError, match="프롬프트가 필요합니다"):
+        client.generate("")
+    assert server.count("POST", "/generate") == 1
+
+def test_connect_failed_distinguishes_connect_from_read_errors():
+    refused = requests.ConnectionError(
+        MaxRetryError(None, "/", NewConnectionError(None, "refused"))
+    )
+    aborted = requests.ConnectionError(ProtocolError("Connection aborted."))
+
+    assert _connect_failed(requests.ConnectTimeout())
+    assert _connect_failed(refused)
+    assert not _connect_failed(requests.ReadTimeout())
+    assert not _connect_failed(aborted)
+
+def test_post_retries_refused_connections():
+    with QwenImageClient("http://127.0.0.1:9", timeout=0.5, max_retries=1, backoff=0.01) as client:
+        with pytest.raises(RetryExhaustedError, match="연결 실패"):
+            client.generate("a cat")